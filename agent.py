@@ -7,19 +7,61 @@ Usage:
 """
 import argparse
 import base64
+import functools
+import hashlib
+import http.client
+import io
 import json
+import math
 import os
 import re
+import socket
 import subprocess
 import sys
+import threading
 import time
-import urllib.error
-import urllib.request
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; stdlib json is the fallback.
+    orjson = None
+
+try:
+    from Foundation import NSAppleScript
+except ImportError:  # PyObjC is optional; AppleScript then goes through /usr/bin/osascript.
+    NSAppleScript = None
+
+try:
+    import Quartz
+except ImportError:  # Without PyObjC, keyboard input falls back to System Events.
+    Quartz = None
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow, screencapture output is resized with sips.
+    Image = None
+
+try:
+    from AppKit import NSPasteboard, NSPasteboardTypeString
+except ImportError:  # Without PyObjC, the clipboard is set through pbcopy.
+    NSPasteboard = None
 
 VLLM_URL = os.environ.get("VLLM_URL", "http://localhost:8000")
 MODEL = os.environ.get("UI_TARS_MODEL", "ByteDance-Seed/UI-TARS-1.5-7B")
 SEQ_BIN = os.environ.get("SEQ_BIN", os.path.expanduser("~/code/seq/cli/cpp/out/bin/seq"))
+SEQ_SOCKET = os.environ.get("SEQ_SOCKET_PATH", "/tmp/seqd.sock")
 SCREENSHOT_PATH = "/tmp/seq_agent_screenshot.png"
+FRONTMOST_APP_TTL_S = 0.5
+
+# Name, bundle id and pid of the frontmost process in a single System Events round-trip.
+FRONTMOST_APP_SCRIPT = (
+    'tell application "System Events" to tell (first application process whose frontmost is true) '
+    'to return (name as text) & "|" & (bundle identifier as text) & "|" & (unix id as text)'
+)
 
 SYSTEM_PROMPT = """You are a GUI agent on macOS. You are given a task and your action history, with screenshots. You need to perform the next action to complete the task.
 
@@ -64,6 +106,101 @@ finished(content='xxx')
 """
 
 
+class SeqdConnection:
+    """Connection to seqd's JSON RPC socket (docs/agent-rpc-v1.md).
+
+    seqd serves many newline-delimited requests per client, so one connection
+    replaces a fork+exec of the seq CLI per pointer event. Connects lazily.
+    seqd serves stream clients one at a time, though, and every other client
+    (including the seq CLI) blocks while this one is connected: callers close
+    it once a step's actions are done, and the next call reconnects.
+    """
+
+    def __init__(self, path, timeout_s=5.0):
+        self.path = path
+        self.timeout_s = timeout_s
+        self._sock = None
+        self._buf = b""
+        self._next_id = 0
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._buf = b""
+
+    def _send(self, data):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout_s)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+        self._sock.sendall(data)
+
+    def call(self, op, **args):
+        """Send one request and return the decoded response; raises OSError/ValueError on failure."""
+        self._next_id += 1
+        data = json_dumps_bytes({"op": op, "request_id": f"agent-{os.getpid()}-{self._next_id}", "args": args}) + b"\n"
+        try:
+            try:
+                self._send(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # seqd restarted since the last call; the request never left, so resend once.
+                self.close()
+                self._send(data)
+            while b"\n" not in self._buf:
+                chunk = self._sock.recv(4096)
+                if not chunk:
+                    raise ConnectionResetError("seqd closed the connection")
+                self._buf += chunk
+        except OSError:
+            self.close()
+            raise
+        resp, _, self._buf = self._buf.partition(b"\n")
+        return json_loads(resp)
+
+
+def run_seq(op, cli_args, capture_output=False, **rpc_args):
+    """Run a seq action over the shared seqd connection, falling back to the seq CLI.
+
+    Returns False only when seqd answered with an error; CLI results are not checked.
+    """
+    conn = parse_and_execute.state.get("seq_conn")
+    if conn is not None:
+        try:
+            resp = conn.call(op, **rpc_args)
+        except (OSError, ValueError):
+            resp = None
+        if resp is not None:
+            if not resp.get("ok"):
+                print(f"  [seqd] {op} failed: {resp.get('error')}", file=sys.stderr)
+                return False
+            return True
+    subprocess.run([SEQ_BIN, *cli_args], capture_output=capture_output)
+    return True
+
+
+def json_dumps_bytes(obj):
+    """Serialize to UTF-8 JSON bytes (orjson when installed; it skips the str -> bytes encode)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def json_loads(data):
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def _seq_json(cmd_args):
     """Run seq and parse JSON output (single line)."""
     try:
@@ -76,44 +213,68 @@ def _seq_json(cmd_args):
     if not out:
         return None
     try:
-        return json.loads(out)
+        return json_loads(out)
     except Exception:
         return None
 
 
-def get_frontmost_app():
-    """Return (name, bundle_id, pid) for the current frontmost app, or (None, None, None)."""
+def get_frontmost_app(force=False):
+    """Return (name, bundle_id, pid) for the current frontmost app, or (None, None, None).
+
+    Results are reused for FRONTMOST_APP_TTL_S so the guard checks around a single
+    step don't each pay an AppleScript round-trip; pass force=True to bypass.
+    """
+    cached = get_frontmost_app.cache
+    if not force and cached is not None and time.monotonic() - cached[3] < FRONTMOST_APP_TTL_S:
+        return cached[0], cached[1], cached[2]
+    name, bundle_id, pid = _query_frontmost_app()
+    get_frontmost_app.cache = (name, bundle_id, pid, time.monotonic())
+    return name, bundle_id, pid
+
+
+# (name, bundle_id, pid, monotonic_ts) of the last query; None forces a fresh one.
+get_frontmost_app.cache = None
+
+
+def invalidate_frontmost_app():
+    """Drop the cached frontmost app after anything that may change focus."""
+    get_frontmost_app.cache = None
+
+
+def _query_frontmost_app():
     # Prefer System Events: seqd can be down or its cached app-state can be stale.
+    # One AppleScript call for all three fields; each osascript spawn costs a LaunchServices round-trip.
     try:
-        p_name = subprocess.run(
-            ["/usr/bin/osascript", "-e",
-             'tell application "System Events" to get name of first application process whose frontmost is true'],
-            capture_output=True, text=True, timeout=2,
-        )
-        p_bid = subprocess.run(
-            ["/usr/bin/osascript", "-e",
-             'tell application "System Events" to get bundle identifier of (first application process whose frontmost is true)'],
-            capture_output=True, text=True, timeout=2,
-        )
-        p_pid = subprocess.run(
-            ["/usr/bin/osascript", "-e",
-             'tell application "System Events" to get unix id of (first application process whose frontmost is true)'],
-            capture_output=True, text=True, timeout=2,
-        )
-        if p_name.returncode == 0 and p_bid.returncode == 0 and p_pid.returncode == 0:
-            pid_s = (p_pid.stdout or "").strip()
-            pid = None
-            try:
-                if pid_s:
-                    pid = int(pid_s)
-            except Exception:
+        ok, out = run_applescript(FRONTMOST_APP_SCRIPT, timeout=2)
+        if ok:
+            parts = out.strip().rsplit("|", 2)
+            if len(parts) == 3:
+                name_s, bid_s, pid_s = (x.strip() for x in parts)
                 pid = None
-            return p_name.stdout.strip() or None, p_bid.stdout.strip() or None, pid
+                try:
+                    if pid_s:
+                        pid = int(pid_s)
+                except Exception:
+                    pid = None
+                # AppleScript renders a missing bundle identifier as "missing value".
+                if bid_s == "missing value":
+                    bid_s = ""
+                return name_s or None, bid_s or None, pid
     except Exception:
         pass
 
     # Fallback: query seqd cached state.
-    st = _seq_json(["app-state"])
+    st = None
+    conn = parse_and_execute.state.get("seq_conn")
+    if conn is not None:
+        try:
+            resp = conn.call("app_state")
+            if resp.get("ok"):
+                st = resp.get("result")
+        except (OSError, ValueError):
+            pass
+    if st is None:
+        st = _seq_json(["app-state"])
     if not st or "current" not in st:
         return None, None, None
     cur = st.get("current") or {}
@@ -141,22 +302,24 @@ def instruction_mentions_app(instruction, app_name=None, bundle_id=None):
     return False
 
 
+# Explicit "open X" patterns, checked in order by infer_target_app().
+_OPEN_APP_PATTERNS = (
+    (re.compile(r"\bopen\s+(the\s+)?finder\b"), "Finder"),
+    (re.compile(r"\bopen\s+(the\s+)?safari\b"), "Safari"),
+    (re.compile(r"\bopen\s+(the\s+)?terminal\b"), "Terminal"),
+    (re.compile(r"\bopen\s+(the\s+)?ghostty\b"), "Ghostty"),
+    (re.compile(r"\bopen\s+(the\s+)?zed\b"), "Zed"),
+    (re.compile(r"\bopen\s+(the\s+)?(google\s+chrome|chrome)\b"), "Google Chrome"),
+)
+
+
 def infer_target_app(instruction):
     """Best-effort: infer which app the task wants, for safe autofocus."""
     s = (instruction or "").lower()
     # Explicit "open X" patterns first.
-    if re.search(r"\bopen\s+(the\s+)?finder\b", s):
-        return "Finder"
-    if re.search(r"\bopen\s+(the\s+)?safari\b", s):
-        return "Safari"
-    if re.search(r"\bopen\s+(the\s+)?terminal\b", s):
-        return "Terminal"
-    if re.search(r"\bopen\s+(the\s+)?ghostty\b", s):
-        return "Ghostty"
-    if re.search(r"\bopen\s+(the\s+)?zed\b", s):
-        return "Zed"
-    if re.search(r"\bopen\s+(the\s+)?(google\s+chrome|chrome)\b", s):
-        return "Google Chrome"
+    for pattern, app in _OPEN_APP_PATTERNS:
+        if pattern.search(s):
+            return app
 
     # Non-"open" tasks that strongly imply Finder.
     if any(w in s for w in ["create a folder", "new folder", "rename folder", "move file", "desktop folder"]):
@@ -164,39 +327,167 @@ def infer_target_app(instruction):
     return None
 
 
+_RE_FOLDER_DQUOTED = re.compile(r'folder\s+(?:called|named)\s+"([^"]+)"', re.IGNORECASE)
+_RE_FOLDER_SQUOTED = re.compile(r"folder\s+(?:called|named)\s+'([^']+)'", re.IGNORECASE)
+_RE_FOLDER_BARE = re.compile(r"folder\s+(?:called|named)\s+([A-Za-z0-9._ -]{1,64})", re.IGNORECASE)
+_RE_FOLDER_STOP = re.compile(r"[\n\r\t.,;:!?]+")
+
+
 def parse_folder_name(instruction):
     """Extract folder name from natural-language instructions like: create a new folder called test."""
     s = (instruction or "").strip()
     if not s:
         return None
     # Quoted names first.
-    m = re.search(r'folder\\s+(?:called|named)\\s+"([^"]+)"', s, re.IGNORECASE)
+    m = _RE_FOLDER_DQUOTED.search(s)
     if m:
         return m.group(1).strip()
-    m = re.search(r"folder\\s+(?:called|named)\\s+'([^']+)'", s, re.IGNORECASE)
+    m = _RE_FOLDER_SQUOTED.search(s)
     if m:
         return m.group(1).strip()
     # Unquoted: take a conservative token tail (stop at punctuation).
-    m = re.search(r"folder\\s+(?:called|named)\\s+([A-Za-z0-9._ -]{1,64})", s, re.IGNORECASE)
+    m = _RE_FOLDER_BARE.search(s)
     if m:
         name = m.group(1).strip()
-        name = re.split(r"[\\n\\r\\t\\.,;:!\\?]+", name)[0].strip()
+        name = _RE_FOLDER_STOP.split(name)[0].strip()
         return name or None
     return None
 
 
-def _osascript_keycode(code):
-    subprocess.run(
-        ["/usr/bin/osascript", "-e", f'tell application "System Events" to key code {int(code)}'],
-        capture_output=True,
-    )
+# Compiled NSAppleScript objects keyed by source (False marks a source that failed to compile).
+_APPLESCRIPT_CACHE = {}
+_APPLESCRIPT_CACHE_MAX = 64
 
 
-def _osascript_cmd_v():
-    subprocess.run(
-        ["/usr/bin/osascript", "-e", 'tell application "System Events" to keystroke "v" using command down'],
-        capture_output=True,
-    )
+def run_applescript(source, timeout=None):
+    """Run AppleScript source and return (ok, result_text).
+
+    With PyObjC available the script is compiled once in-process and reused, which
+    skips the osascript fork/exec and LaunchServices registration on every call.
+    There is no process to kill in-process, so `timeout` is applied with an
+    AppleScript `with timeout` block instead: it bounds the wait for each Apple
+    event reply (every script here talks to System Events), rounded up to whole
+    seconds.
+    """
+    if NSAppleScript is not None:
+        in_process = source
+        if timeout is not None:
+            in_process = f"with timeout of {max(1, math.ceil(timeout))} seconds\n{source}\nend timeout"
+        script = _APPLESCRIPT_CACHE.get(in_process)
+        if script is None:
+            script = NSAppleScript.alloc().initWithSource_(in_process)
+            compiled, _ = script.compileAndReturnError_(None)
+            if not compiled:
+                script = False
+            if len(_APPLESCRIPT_CACHE) < _APPLESCRIPT_CACHE_MAX:
+                _APPLESCRIPT_CACHE[in_process] = script
+        if script:
+            result, _ = script.executeAndReturnError_(None)
+            if result is None:
+                return False, ""
+            return True, result.stringValue() or ""
+    try:
+        p = subprocess.run(["/usr/bin/osascript", "-e", source], capture_output=True, text=True, timeout=timeout)
+    except Exception:
+        return False, ""
+    return p.returncode == 0, p.stdout or ""
+
+
+# macOS virtual key codes for the named keys the model uses in key()/hotkey().
+NAMED_KEYCODES = {
+    "return": 36, "enter": 36, "escape": 53, "esc": 53,
+    "tab": 48, "space": 49, "delete": 51, "backspace": 51,
+    "up": 126, "down": 125, "left": 123, "right": 124,
+}
+
+# macOS virtual key codes (kVK_ANSI_*) so single characters can be posted as CGEvents.
+ANSI_KEYCODES = {
+    "a": 0, "s": 1, "d": 2, "f": 3, "h": 4, "g": 5, "z": 6, "x": 7, "c": 8, "v": 9,
+    "b": 11, "q": 12, "w": 13, "e": 14, "r": 15, "y": 16, "t": 17, "1": 18, "2": 19,
+    "3": 20, "4": 21, "6": 22, "5": 23, "=": 24, "9": 25, "7": 26, "-": 27, "8": 28,
+    "0": 29, "]": 30, "o": 31, "u": 32, "[": 33, "i": 34, "p": 35, "l": 37, "j": 38,
+    "'": 39, "k": 40, ";": 41, "\\": 42, ",": 43, "/": 44, "n": 45, "m": 46, ".": 47,
+    "`": 50,
+}
+
+if Quartz is not None:
+    CG_MODIFIER_FLAGS = {
+        "cmd": Quartz.kCGEventFlagMaskCommand,
+        "shift": Quartz.kCGEventFlagMaskShift,
+        "opt": Quartz.kCGEventFlagMaskAlternate,
+        "ctrl": Quartz.kCGEventFlagMaskControl,
+    }
+else:
+    CG_MODIFIER_FLAGS = {}
+
+
+def _post_key_events(code, mods=(), text=None):
+    """Post a key down/up pair through CoreGraphics (no AppleScript, no subprocess)."""
+    flags = 0
+    for m in mods:
+        flags |= CG_MODIFIER_FLAGS.get(m, 0)
+    for down in (True, False):
+        ev = Quartz.CGEventCreateKeyboardEvent(None, code, down)
+        if text:
+            Quartz.CGEventKeyboardSetUnicodeString(ev, len(text.encode("utf-16-le")) // 2, text)
+        if flags:
+            Quartz.CGEventSetFlags(ev, flags)
+        Quartz.CGEventPost(Quartz.kCGHIDEventTap, ev)
+
+
+def _osascript_keycode(code, mods=()):
+    mod_str = _build_modifiers(mods)
+    if mod_str:
+        run_applescript(f'tell application "System Events" to key code {int(code)} using {{{mod_str}}}')
+    else:
+        run_applescript(f'tell application "System Events" to key code {int(code)}')
+
+
+def _osascript_keystroke(key_char, mods=()):
+    mod_str = _build_modifiers(mods)
+    if mod_str:
+        run_applescript(f'tell application "System Events" to keystroke "{key_char}" using {{{mod_str}}}')
+    else:
+        run_applescript(f'tell application "System Events" to keystroke "{key_char}"')
+
+
+def press_keycode(code, mods=()):
+    """Press a virtual key code with optional modifiers ("cmd", "shift", "opt", "ctrl")."""
+    if Quartz is not None:
+        _post_key_events(int(code), mods)
+    else:
+        _osascript_keycode(code, mods)
+
+
+def press_key(key_char, mods=()):
+    """Press a named key or single character with optional modifiers."""
+    if key_char in NAMED_KEYCODES:
+        press_keycode(NAMED_KEYCODES[key_char], mods)
+        return
+    if Quartz is not None:
+        code = ANSI_KEYCODES.get(key_char)
+        if code is not None:
+            _post_key_events(code, mods)
+            return
+        if not mods and key_char:
+            # Characters without a fixed key code are typed as a unicode key event.
+            _post_key_events(0, text=key_char)
+            return
+    _osascript_keystroke(key_char, mods)
+
+
+def press_cmd_v():
+    press_key("v", ("cmd",))
+
+
+def set_clipboard(text):
+    """Put text on the general pasteboard (in-process when PyObjC is available)."""
+    if NSPasteboard is not None:
+        pb = NSPasteboard.generalPasteboard()
+        pb.clearContents()
+        if pb.setString_forType_(text, NSPasteboardTypeString):
+            return
+    subprocess.run(["/usr/bin/pbcopy"], input=text.encode(), capture_output=True)
 
 
 def nudge_finder_rename(folder_name):
@@ -206,40 +497,40 @@ def nudge_finder_rename(folder_name):
     if not ensure_frontmost_app("Finder", max_tries=5, delay_s=0.25):
         return False
     # Finder typically selects the newly created folder; Return enters rename.
-    _osascript_keycode(36)  # Return
+    press_keycode(36)  # Return
     time.sleep(0.15)
-    subprocess.run(["/usr/bin/pbcopy"], input=folder_name.encode(), capture_output=True)
-    _osascript_cmd_v()
+    set_clipboard(folder_name)
+    press_cmd_v()
     time.sleep(0.05)
-    _osascript_keycode(36)  # Return to commit
+    press_keycode(36)  # Return to commit
     return True
 
 
+# Common synonyms from model outputs.
+_HOTKEY_SYNONYMS = {"alt": "opt", "option": "opt", "command": "cmd", "control": "ctrl"}
+
+# cmd+q (quit), cmd+w (close window/tab), cmd+h (hide), cmd+m (minimize),
+# ctrl+cmd+q (lock screen), cmd+opt+esc (force quit dialog).
+_DANGEROUS_HOTKEYS = (
+    frozenset({"cmd", "q"}),
+    frozenset({"cmd", "w"}),
+    frozenset({"cmd", "h"}),
+    frozenset({"cmd", "m"}),
+    frozenset({"ctrl", "cmd", "q"}),
+    frozenset({"cmd", "opt", "esc"}),
+)
+
+
+@functools.lru_cache(maxsize=256)
 def _normalize_hotkey_tokens(keys):
-    parts = [p.strip().lower() for p in keys.split() if p.strip()]
-    # Common synonyms from model outputs.
-    mod_map = {"alt": "opt", "option": "opt", "command": "cmd", "control": "ctrl"}
-    return [mod_map.get(p, p) for p in parts]
+    # Cached: models repeat the same few hotkey strings, so return an immutable tuple.
+    return tuple(_HOTKEY_SYNONYMS.get(p, p) for p in keys.lower().split())
 
 
 def hotkey_is_dangerous(keys):
     """Return True if the hotkey is likely to quit/close/lock/hide/minimize."""
-    toks_set = set(_normalize_hotkey_tokens(keys))
-    # cmd+q (quit), cmd+w (close window/tab), cmd+h (hide), cmd+m (minimize),
-    # ctrl+cmd+q (lock screen), cmd+opt+esc (force quit dialog).
-    if "cmd" in toks_set and "q" in toks_set:
-        return True
-    if "cmd" in toks_set and "w" in toks_set:
-        return True
-    if "cmd" in toks_set and "h" in toks_set:
-        return True
-    if "cmd" in toks_set and "m" in toks_set:
-        return True
-    if toks_set.issuperset({"ctrl", "cmd", "q"}):
-        return True
-    if toks_set.issuperset({"cmd", "opt", "esc"}):
-        return True
-    return False
+    toks = frozenset(_normalize_hotkey_tokens(keys))
+    return any(combo <= toks for combo in _DANGEROUS_HOTKEYS)
 
 
 def ensure_frontmost_app(app_name, max_tries=3, delay_s=0.35):
@@ -251,11 +542,13 @@ def ensure_frontmost_app(app_name, max_tries=3, delay_s=0.35):
         if cur_name == app_name:
             return True
         try:
-            subprocess.run([SEQ_BIN, "open-app", app_name], capture_output=True)
+            run_seq("open_app", ["open-app", app_name], capture_output=True, name=app_name)
         except FileNotFoundError:
             return False
+        finally:
+            invalidate_frontmost_app()
         time.sleep(delay_s)
-    cur_name, _, _ = get_frontmost_app()
+    cur_name, _, _ = get_frontmost_app(force=True)
     return cur_name == app_name
 
 
@@ -287,12 +580,28 @@ def ensure_not_protected(state, action_desc, fallback_app="Finder"):
     return False, f"guard: refused to {action_desc} while protected app is frontmost ({cur_name}); could not switch to {target}"
 
 
+_RE_RESOLUTION = re.compile(r"(\d+)\s*x\s*(\d+)")
+
+
+@functools.lru_cache(maxsize=1)
 def get_screen_size():
     """Get the main display resolution and Retina scale factor.
 
     Returns (pixel_width, pixel_height, scale) where scale is 2 for Retina, 1 otherwise.
     CGEvent uses 'points' (pixels / scale), so callers must divide by scale.
+    Cached: system_profiler takes seconds, and the display doesn't change mid-run.
     """
+    if Quartz is not None:
+        try:
+            mode = Quartz.CGDisplayCopyDisplayMode(Quartz.CGMainDisplayID())
+            if mode is not None:
+                px_w = Quartz.CGDisplayModeGetPixelWidth(mode)
+                px_h = Quartz.CGDisplayModeGetPixelHeight(mode)
+                pt_w = Quartz.CGDisplayModeGetWidth(mode)
+                if px_w and px_h and pt_w:
+                    return int(px_w), int(px_h), max(1, round(px_w / pt_w))
+        except Exception:
+            pass
     result = subprocess.run(
         ["system_profiler", "SPDisplaysDataType"],
         capture_output=True, text=True
@@ -301,7 +610,7 @@ def get_screen_size():
     for line in result.stdout.splitlines():
         if "Resolution" in line:
             # e.g. "Resolution: 3456 x 2234 Retina"  or  "Resolution: 1920 x 1080"
-            m = re.search(r"(\d+)\s*x\s*(\d+)", line)
+            m = _RE_RESOLUTION.search(line)
             if m:
                 scale = 2 if is_retina else 1
                 return int(m.group(1)), int(m.group(2)), scale
@@ -309,8 +618,63 @@ def get_screen_size():
     return 1920, 1080, 1
 
 
-def take_screenshot():
-    """Take a screenshot, resize to fit model context, and return base64-encoded PNG."""
+# Reused across steps: creating a CIContext sets up GPU state and is far costlier than a render.
+_CI_CONTEXT = None
+
+
+def _capture_png_quartz():
+    """Capture the main display in-process and return PNG bytes scaled to RESIZED_WIDTH.
+
+    Replaces the screencapture + sips + /tmp round-trip: one CGImage grab, a Lanczos
+    downscale on the GPU via Core Image, and a single in-memory PNG encode.
+    """
+    global _CI_CONTEXT
+    image = Quartz.CGDisplayCreateImage(Quartz.CGMainDisplayID())
+    if image is None:
+        return None
+    width = Quartz.CGImageGetWidth(image)
+    height = Quartz.CGImageGetHeight(image)
+    if width != RESIZED_WIDTH:
+        if _CI_CONTEXT is None:
+            _CI_CONTEXT = Quartz.CIContext.contextWithOptions_(None)
+        scaler = Quartz.CIFilter.filterWithName_("CILanczosScaleTransform")
+        scaler.setValue_forKey_(Quartz.CIImage.imageWithCGImage_(image), "inputImage")
+        scaler.setValue_forKey_(RESIZED_WIDTH / width, "inputScale")
+        scaler.setValue_forKey_(1.0, "inputAspectRatio")
+        rect = Quartz.CGRectMake(0, 0, RESIZED_WIDTH, get_resized_height(width, height))
+        image = _CI_CONTEXT.createCGImage_fromRect_(scaler.valueForKey_("outputImage"), rect)
+        if image is None:
+            return None
+    data = Quartz.CFDataCreateMutable(None, 0)
+    dest = Quartz.CGImageDestinationCreateWithData(data, "public.png", 1, None)
+    Quartz.CGImageDestinationAddImage(dest, image, None)
+    if not Quartz.CGImageDestinationFinalize(dest):
+        return None
+    # NSData exposes its bytes through the buffer protocol; hand that out instead of copying.
+    return memoryview(data.bytes())
+
+
+def _resize_png_pillow(path):
+    """Decode, resize and re-encode in one in-process pass (replaces the sips spawn)."""
+    with Image.open(path) as img:
+        width, height = img.size
+        resized = img.resize((RESIZED_WIDTH, get_resized_height(width, height)), Image.LANCZOS)
+    out = io.BytesIO()
+    # Level 1 is several times faster than the default 6 for a slightly larger file.
+    resized.save(out, "PNG", compress_level=1)
+    return out.getbuffer()
+
+
+def capture_png():
+    """Take a screenshot, resize to fit model context, and return the PNG as a bytes-like buffer."""
+    if Quartz is not None:
+        try:
+            png = _capture_png_quartz()
+        except Exception as e:
+            print(f"[!] in-process capture failed, falling back to screencapture: {e}", file=sys.stderr)
+            png = None
+        if png:
+            return png
     result = subprocess.run(
         ["/usr/sbin/screencapture", "-x", "-C", "-t", "png", SCREENSHOT_PATH],
         capture_output=True
@@ -319,58 +683,267 @@ def take_screenshot():
         print(f"[!] screencapture failed: {result.stderr.decode()}", file=sys.stderr)
         return None
     # Resize to 1280px wide max to keep image tokens manageable for the 4096 context.
+    if Image is not None:
+        try:
+            return _resize_png_pillow(SCREENSHOT_PATH)
+        except Exception as e:
+            print(f"[!] Pillow resize failed, falling back to sips: {e}", file=sys.stderr)
     resized = SCREENSHOT_PATH + ".resized.png"
     subprocess.run([
-        "/usr/bin/sips", "--resampleWidth", "1280",
+        "/usr/bin/sips", "--resampleWidth", str(RESIZED_WIDTH),
         SCREENSHOT_PATH, "--out", resized,
     ], capture_output=True)
     path = resized if os.path.exists(resized) else SCREENSHOT_PATH
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+    with open(path, "rb", buffering=0) as f:
+        buf = bytearray(os.fstat(f.fileno()).st_size)
+        n = f.readinto(buf)
+    return memoryview(buf)[:n]
+
+
+SCREEN_HASH_SIZE = 64
+SCREEN_POLL_S = 0.05
+
+
+def _screen_hash_fast():
+    """Hash a tiny downsample of the main display, or None without CoreGraphics."""
+    if Quartz is None:
+        return None
+    try:
+        image = Quartz.CGDisplayCreateImage(Quartz.CGMainDisplayID())
+        if image is None:
+            return None
+        n = SCREEN_HASH_SIZE
+        ctx = Quartz.CGBitmapContextCreate(
+            None, n, n, 8, n * 4, Quartz.CGColorSpaceCreateDeviceRGB(), Quartz.kCGImageAlphaPremultipliedLast,
+        )
+        Quartz.CGContextSetInterpolationQuality(ctx, Quartz.kCGInterpolationLow)
+        Quartz.CGContextDrawImage(ctx, Quartz.CGRectMake(0, 0, n, n), image)
+        small = Quartz.CGBitmapContextCreateImage(ctx)
+        data = Quartz.CGDataProviderCopyData(Quartz.CGImageGetDataProvider(small))
+        return hashlib.blake2b(memoryview(data.bytes()), digest_size=8).digest()
+    except Exception:
+        return None
+
+
+def wait_for_screen_change(max_s):
+    """Sleep up to max_s, returning early once the screen has changed and settled.
+
+    Returns True on an early exit. Without CoreGraphics this is a plain sleep.
+    """
+    last = _screen_hash_fast()
+    if last is None:
+        time.sleep(max_s)
+        return False
+    deadline = time.monotonic() + max_s
+    changed = False
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(SCREEN_POLL_S, remaining))
+        cur = _screen_hash_fast()
+        if cur is None:
+            continue
+        if cur != last:
+            changed = True
+        elif changed:
+            # Changed, then identical across one poll: the UI has settled.
+            return True
+        last = cur
+
+
+class InlineImagePayload:
+    """JSON request body with the screenshot inlined as a base64 data URL.
+
+    The base64 is produced chunk by chunk while http.client writes the body, so the
+    encoded image and the serialized JSON around it never exist as one big buffer.
+    Iterable more than once, so a retried request can resend it.
+    """
+
+    _SENTINEL = "@@SEQ_AGENT_INLINE_IMAGE@@"
+    _CHUNK = 3 * 16384  # Multiple of 3: each chunk encodes without padding.
+
+    def __init__(self, payload, png):
+        body = json_dumps_bytes(payload)
+        prefix, found, suffix = body.rpartition(self._SENTINEL.encode())
+        if not found:
+            raise ValueError("payload has no image placeholder")
+        self._prefix = prefix + b"data:image/png;base64,"
+        self._suffix = suffix
+        self._png = memoryview(png)
+
+    @classmethod
+    def image_url(cls):
+        """Placeholder to put where the data URL belongs in the payload."""
+        return cls._SENTINEL
+
+    def __len__(self):
+        return len(self._prefix) + 4 * ((len(self._png) + 2) // 3) + len(self._suffix)
+
+    def __iter__(self):
+        yield self._prefix
+        png = self._png
+        for i in range(0, len(png), self._CHUNK):
+            yield base64.b64encode(png[i:i + self._CHUNK])
+        yield self._suffix
+
+
+class ScreenshotServer:
+    """Serve the latest screenshot over loopback so vLLM can fetch it by URL.
+
+    Sending a short URL instead of a base64 data URL keeps the request JSON small:
+    no base64 encode, no ~33% inflation, no giant string to escape per step.
+    Only usable when the vLLM server can reach this host's loopback interface.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self._lock = threading.Lock()
+        self._png = b""
+        self._version = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    png = server._png
+                if not self.path.startswith("/latest.png") or not png:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(png)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(png)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.host, self.port = self.httpd.server_address[:2]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="screenshot-server", daemon=True)
+        self.thread.start()
+
+    def publish(self, png):
+        """Swap in a new screenshot and return a URL unique to it (defeats fetch caching)."""
+        with self._lock:
+            self._png = png
+            self._version += 1
+            version = self._version
+        return f"http://{self.host}:{self.port}/latest.png?v={version}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# Kept open across steps so each request reuses the TCP (and TLS) session to vLLM.
+_VLLM_CONN = None
+
+
+def _vllm_connection():
+    global _VLLM_CONN
+    if _VLLM_CONN is None:
+        u = urllib.parse.urlsplit(VLLM_URL)
+        conn_cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+        _VLLM_CONN = conn_cls(u.hostname, u.port, timeout=60)
+    return _VLLM_CONN
+
+
+def vllm_post(path, body):
+    """POST a JSON body to vLLM over the keep-alive connection; return (status, reason, body).
+
+    body is bytes or a re-iterable with a __len__ (e.g. InlineImagePayload).
+
+    A server-closed idle connection surfaces as a reset on the next request, so that
+    case reconnects and retries once.
+    """
+    global _VLLM_CONN
+    url_path = urllib.parse.urlsplit(VLLM_URL).path.rstrip("/") + path
+    for attempt in range(2):
+        conn = _vllm_connection()
+        try:
+            # Explicit length so an iterable body is sent as-is rather than chunk-encoded.
+            headers = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+            conn.request("POST", url_path, body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.reason, resp.read()
+        except (ConnectionResetError, BrokenPipeError, http.client.CannotSendRequest,
+                http.client.BadStatusLine):
+            conn.close()
+            _VLLM_CONN = None
+            if attempt:
+                raise
+        except Exception:
+            conn.close()
+            _VLLM_CONN = None
+            raise
+
+
+def build_system_message(instruction):
+    """Build the system message once per run.
+
+    Sending byte-identical system text every step lets vLLM's prefix cache reuse
+    its KV blocks instead of re-prefilling the ~4KB prompt.
+    """
+    return {"role": "system", "content": SYSTEM_PROMPT.replace("{instruction}", instruction)}
 
 
-def query_ui_tars(instruction, screenshot_b64, history_text=""):
-    """Send screenshot + instruction to UI-TARS via vLLM OpenAI-compatible API."""
+def query_ui_tars(system_msg, image, history_text="", samples=1, temperature=0.0):
+    """Send screenshot + instruction to UI-TARS via vLLM OpenAI-compatible API.
+
+    system_msg comes from build_system_message(). image is either a ScreenshotServer
+    URL or the PNG buffer itself, which is then streamed inline as a data URL.
+    With samples > 1 the completions come back from one request (vLLM batches
+    them and shares the prompt prefill) and the majority action wins.
+    """
 
     user_content = []
     if history_text:
         user_content.append({"type": "text", "text": history_text})
+    inline = not isinstance(image, str)
     user_content.append({
         "type": "image_url",
-        "image_url": {"url": f"data:image/png;base64,{screenshot_b64}"}
+        "image_url": {"url": InlineImagePayload.image_url() if inline else image}
     })
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT.replace("{instruction}", instruction)},
-        {"role": "user", "content": user_content},
-    ]
+    messages = [system_msg, {"role": "user", "content": user_content}]
 
-    payload = json.dumps({
+    payload = {
         "model": MODEL,
         "messages": messages,
         "max_tokens": 512,
-        "temperature": 0.0,
-    }).encode()
+        "temperature": temperature,
+        "n": samples,
+    }
 
-    req = urllib.request.Request(
-        f"{VLLM_URL}/v1/chat/completions",
-        data=payload,
-        headers={"Content-Type": "application/json"},
-    )
     try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            data = json.loads(resp.read().decode())
-            return data["choices"][0]["message"]["content"]
-    except urllib.error.HTTPError as e:
-        body = e.read().decode() if e.fp else ""
-        print(f"[!] UI-TARS request failed: {e} — {body[:500]}", file=sys.stderr)
-        return None
+        payload = InlineImagePayload(payload, image) if inline else json_dumps_bytes(payload)
+        status, reason, body = vllm_post("/v1/chat/completions", payload)
+        if status >= 400:
+            text = body.decode(errors="replace")
+            print(f"[!] UI-TARS request failed: HTTP {status} {reason} — {text[:500]}", file=sys.stderr)
+            return None
+        data = json_loads(body)
+        contents = [c["message"]["content"] for c in data["choices"] if c["message"].get("content")]
+        return pick_majority_response(contents)
     except Exception as e:
         print(f"[!] UI-TARS request failed: {e}", file=sys.stderr)
         return None
 
 
-RESIZED_WIDTH = 1280  # Must match the sips resize width in take_screenshot()
+def pick_majority_response(responses):
+    """Return the first response whose action is the most common one (self-consistency vote)."""
+    if len(responses) <= 1:
+        return responses[0] if responses else None
+    votes = Counter(action_str_from_response(r) for r in responses)
+    winner, count = votes.most_common(1)[0]
+    print(f"  Vote: {count}/{len(responses)} for {winner[:80]}")
+    return next(r for r in responses if action_str_from_response(r) == winner)
+
+
+RESIZED_WIDTH = 1280  # Width of the screenshots sent to the model (see capture_png())
 
 
 def get_resized_height(screen_w, screen_h):
@@ -391,6 +964,226 @@ def normalize_to_pixels(x_norm, y_norm, screen_w, screen_h, scale=1):
     return px, py
 
 
+# Action patterns; coordinate actions accept both point= and the older start_box= spelling.
+_RE_FINISHED = re.compile(r"finished\(content='(.*)'\)")
+_RE_OPEN_APP = re.compile(r"open_app\(name='(.+?)'\)")
+_RE_KEY = re.compile(r"key\(name='(.+?)'\)")
+_RE_CLICK = re.compile(r"click\((?:point|start_box)='(.+?)'\)")
+_RE_LEFT_DOUBLE = re.compile(r"left_double\((?:point|start_box)='(.+?)'\)")
+_RE_RIGHT_SINGLE = re.compile(r"right_single\((?:point|start_box)='(.+?)'\)")
+_RE_DRAG = re.compile(r"drag\(start_point='(.+?)',\s*end_point='(.+?)'\)|drag\(start_box='(.+?)',\s*end_box='(.+?)'\)")
+_RE_SCROLL = re.compile(r"scroll\((?:point|start_box)='(.+?)',\s*direction='(.+?)'\)")
+_RE_HOTKEY = re.compile(r"hotkey\(key='(.+?)'\)")
+_RE_TYPE = re.compile(r"type\(content='(.+?)'\)", re.DOTALL)
+# <point>x y</point> (space-separated) and (x,y) (start_box, comma-separated).
+_RE_POINT_TAG = re.compile(r"<point>(\d+)\s+(\d+)</point>")
+_RE_POINT_TUPLE = re.compile(r"\((\d+)\s*,\s*(\d+)\)")
+
+
+def extract_point(s):
+    """Parse model coordinates from <point>x y</point> or (x,y); None if neither matches."""
+    m = _RE_POINT_TAG.search(s)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    m = _RE_POINT_TUPLE.search(s)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    return None
+
+
+def _guard_blocked(action_desc):
+    """Return a blocked result if the protected-app guard refuses the action, else None."""
+    ok, note = ensure_not_protected(parse_and_execute.state, action_desc)
+    if ok:
+        return None
+    print(f"  [blocked] {note}", file=sys.stderr)
+    return False, "blocked", note
+
+
+# Action handlers take (action_str, screen_w, screen_h, scale) and return
+# (done, action_type, note), or None when the arguments don't parse.
+
+def _do_finished(action_str, screen_w, screen_h, scale):
+    m = _RE_FINISHED.match(action_str)
+    if not m:
+        return None
+    print(f"\n[done] {m.group(1)}")
+    return True, "finished", "finished"
+
+
+def _do_wait(action_str, screen_w, screen_h, scale):
+    if action_str.strip() != "wait()":
+        return None
+    wait_s = float(parse_and_execute.state.get("wait_s", 1.0))
+    print(f"  -> waiting up to {wait_s:.2f}s for the screen to change...")
+    wait_for_screen_change(wait_s)
+    return False, "wait", "wait"
+
+
+def _do_open_app(action_str, screen_w, screen_h, scale):
+    # Uses seq open-app directly (reliable, no visual search).
+    m = _RE_OPEN_APP.match(action_str)
+    if not m:
+        return None
+    app_name = m.group(1)
+    print(f"  -> open-app({app_name})")
+    parse_and_execute.state["last_opened_app"] = app_name
+    run_seq("open_app", ["open-app", app_name], capture_output=True, name=app_name)
+    invalidate_frontmost_app()
+    ok = ensure_frontmost_app(app_name, max_tries=5, delay_s=0.4)
+    return False, "open_app", f"opened app: {app_name} (frontmost={ok})"
+
+
+def _do_key(action_str, screen_w, screen_h, scale):
+    # Single key press (return, escape, tab, space, delete, etc.)
+    m = _RE_KEY.match(action_str)
+    if not m:
+        return None
+    blocked = _guard_blocked("send key")
+    if blocked:
+        return blocked
+    key_name = m.group(1).strip().lower()
+    if key_name in NAMED_KEYCODES:
+        code = NAMED_KEYCODES[key_name]
+        print(f"  -> key({key_name} = keycode {code})")
+        press_keycode(code)
+    else:
+        # Try as a single character keystroke
+        print(f"  -> key({key_name})")
+        press_key(key_name)
+    return False, "key", "key"
+
+
+def _pointer_action(pattern, action_desc, seq_cmd, rpc_op, action_type):
+    """Build a handler for single-point actions (click, double-click, right-click)."""
+    def handler(action_str, screen_w, screen_h, scale):
+        m = pattern.match(action_str)
+        if not m:
+            return None
+        blocked = _guard_blocked(action_desc)
+        if blocked:
+            return blocked
+        pt = extract_point(m.group(1))
+        if not pt:
+            return None
+        px, py = normalize_to_pixels(pt[0], pt[1], screen_w, screen_h, scale)
+        print(f"  -> {seq_cmd}({px}, {py})")
+        run_seq(rpc_op, [seq_cmd, str(px), str(py)], x=px, y=py)
+        return False, action_type, action_type
+    return handler
+
+
+def _do_drag(action_str, screen_w, screen_h, scale):
+    m = _RE_DRAG.match(action_str)
+    if not m:
+        return None
+    blocked = _guard_blocked("drag")
+    if blocked:
+        return blocked
+    sp = extract_point(m.group(1) or m.group(3))
+    ep = extract_point(m.group(2) or m.group(4))
+    if not (sp and ep):
+        return None
+    sx, sy = normalize_to_pixels(sp[0], sp[1], screen_w, screen_h, scale)
+    ex, ey = normalize_to_pixels(ep[0], ep[1], screen_w, screen_h, scale)
+    print(f"  -> drag({sx},{sy} -> {ex},{ey})")
+    run_seq("drag", ["drag", str(sx), str(sy), str(ex), str(ey)], x1=sx, y1=sy, x2=ex, y2=ey)
+    return False, "drag", "drag"
+
+
+def _do_scroll(action_str, screen_w, screen_h, scale):
+    m = _RE_SCROLL.match(action_str)
+    if not m:
+        return None
+    blocked = _guard_blocked("scroll")
+    if blocked:
+        return blocked
+    pt = extract_point(m.group(1))
+    direction = m.group(2).strip()
+    if not pt:
+        return None
+    px, py = normalize_to_pixels(pt[0], pt[1], screen_w, screen_h, scale)
+    dy = {"down": -3, "up": 3, "left": 0, "right": 0}.get(direction, -3)
+    print(f"  -> scroll({px},{py}, {direction})")
+    run_seq("scroll", ["scroll", str(px), str(py), str(dy)], x=px, y=py, dy=dy)
+    return False, "scroll", "scroll"
+
+
+def _do_hotkey(action_str, screen_w, screen_h, scale):
+    # Modifier combos like "cmd n", "cmd shift n".
+    m = _RE_HOTKEY.match(action_str)
+    if not m:
+        return None
+    keys = m.group(1).strip()
+    # Guardrail: block close/quit/lock/hide/minimize unless instruction explicitly requests it.
+    allow_close = instruction_allows_close(parse_and_execute.state.get("instruction")) or parse_and_execute.state.get("allow_dangerous")
+    if hotkey_is_dangerous(keys) and not allow_close:
+        note = f"guard: blocked dangerous hotkey '{keys}' (set --allow-dangerous or include close/quit intent)"
+        print(f"  [blocked] {note}", file=sys.stderr)
+        return False, "blocked", note
+    blocked = _guard_blocked("send hotkey")
+    if blocked:
+        return blocked
+    parts = keys.split()
+    # Map modifier names
+    mod_map = {"ctrl": "cmd", "alt": "opt", "command": "cmd", "option": "opt"}
+    seq_keys = [mod_map.get(p.lower(), p.lower()) for p in parts]
+
+    # If it's a single non-modifier key, treat as key() instead
+    modifiers = {"cmd", "opt", "ctrl", "shift"}
+    mods = [k for k in seq_keys if k in modifiers]
+    non_mods = [k for k in seq_keys if k not in modifiers]
+
+    if not mods and len(non_mods) == 1:
+        # Bare key like "enter" — delegate to key code path
+        key_name = non_mods[0]
+        if key_name in NAMED_KEYCODES:
+            print(f"  -> key({key_name})")
+            press_keycode(NAMED_KEYCODES[key_name])
+        else:
+            print(f"  -> keystroke({key_name})")
+            press_key(key_name)
+    else:
+        # Modifier combo
+        key_char = non_mods[0] if non_mods else ""
+        print(f"  -> hotkey({'+'.join(seq_keys)})")
+        press_key(key_char, mods)
+    return False, "hotkey", "hotkey"
+
+
+def _do_type(action_str, screen_w, screen_h, scale):
+    m = _RE_TYPE.match(action_str)
+    if not m:
+        return None
+    blocked = _guard_blocked("type")
+    if blocked:
+        return blocked
+    content = m.group(1)
+    # Unescape
+    content = content.replace("\\'", "'").replace('\\"', '"').replace("\\n", "\n")
+    print(f"  -> type({repr(content[:50])}...)")
+    # Paste (clipboard + cmd-v) for reliable text input
+    set_clipboard(content)
+    press_cmd_v()
+    return False, "type", "type"
+
+
+# Action name (text before the first "(") -> handler, so each response runs one argument regex.
+ACTION_HANDLERS = {
+    "finished": _do_finished,
+    "wait": _do_wait,
+    "open_app": _do_open_app,
+    "key": _do_key,
+    "click": _pointer_action(_RE_CLICK, "click", "click", "click", "click"),
+    "left_double": _pointer_action(_RE_LEFT_DOUBLE, "double-click", "double-click", "double_click", "double_click"),
+    "right_single": _pointer_action(_RE_RIGHT_SINGLE, "right-click", "right-click", "right_click", "right_click"),
+    "drag": _do_drag,
+    "scroll": _do_scroll,
+    "hotkey": _do_hotkey,
+    "type": _do_type,
+}
+
+
 def parse_and_execute(response, screen_w, screen_h, scale=1):
     """Parse UI-TARS response and execute via seq."""
     if not response:
@@ -413,229 +1206,11 @@ def parse_and_execute(response, screen_w, screen_h, scale=1):
     print(f"  Thought: {thought}")
     print(f"  Action:  {action_str}")
 
-    # Parse finished
-    m = re.match(r"finished\(content='(.*)'\)", action_str)
-    if m:
-        print(f"\n[done] {m.group(1)}")
-        return True, "finished", "finished"
-
-    # Parse wait
-    if action_str.strip() == "wait()":
-        wait_s = float(parse_and_execute.state.get("wait_s", 1.0))
-        print(f"  -> waiting {wait_s:.2f}s...")
-        time.sleep(wait_s)
-        return False, "wait", "wait"
-
-    # Parse open_app — uses seq open-app directly (reliable, no visual search)
-    m = re.match(r"open_app\(name='(.+?)'\)", action_str)
-    if m:
-        app_name = m.group(1)
-        print(f"  -> open-app({app_name})")
-        parse_and_execute.state["last_opened_app"] = app_name
-        subprocess.run([SEQ_BIN, "open-app", app_name], capture_output=True)
-        ok = ensure_frontmost_app(app_name, max_tries=5, delay_s=0.4)
-        return False, "open_app", f"opened app: {app_name} (frontmost={ok})"
-
-    # Parse key — single key press (return, escape, tab, space, delete, etc.)
-    m = re.match(r"key\(name='(.+?)'\)", action_str)
-    if m:
-        ok, note = ensure_not_protected(parse_and_execute.state, "send key")
-        if not ok:
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        key_name = m.group(1).strip().lower()
-        # Map to AppleScript key codes
-        key_map = {
-            "return": (36, None), "enter": (36, None),
-            "escape": (53, None), "esc": (53, None),
-            "tab": (48, None),
-            "space": (49, None),
-            "delete": (51, None), "backspace": (51, None),
-            "up": (126, None), "down": (125, None),
-            "left": (123, None), "right": (124, None),
-        }
-        if key_name in key_map:
-            code, _ = key_map[key_name]
-            print(f"  -> key({key_name} = keycode {code})")
-            subprocess.run([
-                "/usr/bin/osascript", "-e",
-                f'tell application "System Events" to key code {code}'
-            ])
-        else:
-            # Try as a single character keystroke
-            print(f"  -> key({key_name})")
-            subprocess.run([
-                "/usr/bin/osascript", "-e",
-                f'tell application "System Events" to keystroke "{key_name}"'
-            ])
-        return False, "key", note or "key"
-
-    # Parse coordinates from multiple formats:
-    # - <point>x y</point>  (new format, space-separated)
-    # - (x,y)               (start_box format, comma-separated)
-    def extract_point(s):
-        # Try <point>x y</point> format
-        m = re.search(r"<point>(\d+)\s+(\d+)</point>", s)
-        if m:
-            return int(m.group(1)), int(m.group(2))
-        # Try (x,y) format (from start_box/end_box)
-        m = re.search(r"\((\d+)\s*,\s*(\d+)\)", s)
-        if m:
-            return int(m.group(1)), int(m.group(2))
-        return None
-
-    # Parse click — multiple format variants
-    m = (re.match(r"click\(point='(.+?)'\)", action_str) or
-         re.match(r"click\(start_box='(.+?)'\)", action_str))
-    if m:
-        ok, note = ensure_not_protected(parse_and_execute.state, "click")
-        if not ok:
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        pt = extract_point(m.group(1))
-        if pt:
-            px, py = normalize_to_pixels(pt[0], pt[1], screen_w, screen_h, scale)
-            print(f"  -> click({px}, {py})")
-            subprocess.run([SEQ_BIN, "click", str(px), str(py)])
-            return False, "click", note or "click"
-
-    # Parse double click
-    m = (re.match(r"left_double\(point='(.+?)'\)", action_str) or
-         re.match(r"left_double\(start_box='(.+?)'\)", action_str))
-    if m:
-        ok, note = ensure_not_protected(parse_and_execute.state, "double-click")
-        if not ok:
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        pt = extract_point(m.group(1))
-        if pt:
-            px, py = normalize_to_pixels(pt[0], pt[1], screen_w, screen_h, scale)
-            print(f"  -> double-click({px}, {py})")
-            subprocess.run([SEQ_BIN, "double-click", str(px), str(py)])
-            return False, "double_click", note or "double_click"
-
-    # Parse right click
-    m = (re.match(r"right_single\(point='(.+?)'\)", action_str) or
-         re.match(r"right_single\(start_box='(.+?)'\)", action_str))
-    if m:
-        ok, note = ensure_not_protected(parse_and_execute.state, "right-click")
-        if not ok:
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        pt = extract_point(m.group(1))
-        if pt:
-            px, py = normalize_to_pixels(pt[0], pt[1], screen_w, screen_h, scale)
-            print(f"  -> right-click({px}, {py})")
-            subprocess.run([SEQ_BIN, "right-click", str(px), str(py)])
-            return False, "right_click", note or "right_click"
-
-    # Parse drag — multiple format variants
-    m = (re.match(r"drag\(start_point='(.+?)',\s*end_point='(.+?)'\)", action_str) or
-         re.match(r"drag\(start_box='(.+?)',\s*end_box='(.+?)'\)", action_str))
-    if m:
-        ok, note = ensure_not_protected(parse_and_execute.state, "drag")
-        if not ok:
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        sp = extract_point(m.group(1))
-        ep = extract_point(m.group(2))
-        if sp and ep:
-            sx, sy = normalize_to_pixels(sp[0], sp[1], screen_w, screen_h, scale)
-            ex, ey = normalize_to_pixels(ep[0], ep[1], screen_w, screen_h, scale)
-            print(f"  -> drag({sx},{sy} -> {ex},{ey})")
-            subprocess.run([SEQ_BIN, "drag", str(sx), str(sy), str(ex), str(ey)])
-            return False, "drag", note or "drag"
-
-    # Parse scroll — multiple format variants
-    m = (re.match(r"scroll\(point='(.+?)',\s*direction='(.+?)'\)", action_str) or
-         re.match(r"scroll\(start_box='(.+?)',\s*direction='(.+?)'\)", action_str))
-    if m:
-        ok, note = ensure_not_protected(parse_and_execute.state, "scroll")
-        if not ok:
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        pt = extract_point(m.group(1))
-        direction = m.group(2).strip()
-        if pt:
-            px, py = normalize_to_pixels(pt[0], pt[1], screen_w, screen_h, scale)
-            dy = {"down": -3, "up": 3, "left": 0, "right": 0}.get(direction, -3)
-            print(f"  -> scroll({px},{py}, {direction})")
-            subprocess.run([SEQ_BIN, "scroll", str(px), str(py), str(dy)])
-            return False, "scroll", note or "scroll"
-
-    # Parse hotkey (modifier combos like "cmd n", "cmd shift n")
-    m = re.match(r"hotkey\(key='(.+?)'\)", action_str)
-    if m:
-        keys = m.group(1).strip()
-        # Guardrail: block close/quit/lock/hide/minimize unless instruction explicitly requests it.
-        allow_close = instruction_allows_close(parse_and_execute.state.get("instruction")) or parse_and_execute.state.get("allow_dangerous")
-        if hotkey_is_dangerous(keys) and not allow_close:
-            note = f"guard: blocked dangerous hotkey '{keys}' (set --allow-dangerous or include close/quit intent)"
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        ok, note = ensure_not_protected(parse_and_execute.state, "send hotkey")
-        if not ok:
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        parts = keys.split()
-        # Map modifier names
-        mod_map = {"ctrl": "cmd", "alt": "opt", "command": "cmd", "option": "opt"}
-        seq_keys = [mod_map.get(p.lower(), p.lower()) for p in parts]
-
-        # If it's a single non-modifier key, treat as key() instead
-        modifiers = {"cmd", "opt", "ctrl", "shift"}
-        mods = [k for k in seq_keys if k in modifiers]
-        non_mods = [k for k in seq_keys if k not in modifiers]
-
-        if not mods and len(non_mods) == 1:
-            # Bare key like "enter" — delegate to key code path
-            key_name = non_mods[0]
-            key_map = {
-                "return": 36, "enter": 36, "escape": 53, "esc": 53,
-                "tab": 48, "space": 49, "delete": 51, "backspace": 51,
-                "up": 126, "down": 125, "left": 123, "right": 124,
-            }
-            if key_name in key_map:
-                print(f"  -> key({key_name})")
-                subprocess.run([
-                    "/usr/bin/osascript", "-e",
-                    f'tell application "System Events" to key code {key_map[key_name]}'
-                ])
-            else:
-                print(f"  -> keystroke({key_name})")
-                subprocess.run([
-                    "/usr/bin/osascript", "-e",
-                    f'tell application "System Events" to keystroke "{key_name}"'
-                ])
-        else:
-            # Modifier combo
-            key_char = non_mods[0] if non_mods else ""
-            mod_str = _build_modifiers(mods)
-            print(f"  -> hotkey({'+'.join(seq_keys)})")
-            subprocess.run([
-                "/usr/bin/osascript", "-e",
-                f'tell application "System Events" to keystroke "{key_char}" using {{{mod_str}}}'
-            ])
-        return False, "hotkey", note or "hotkey"
-
-    # Parse type
-    m = re.match(r"type\(content='(.+?)'\)", action_str, re.DOTALL)
-    if m:
-        ok, note = ensure_not_protected(parse_and_execute.state, "type")
-        if not ok:
-            print(f"  [blocked] {note}", file=sys.stderr)
-            return False, "blocked", note
-        content = m.group(1)
-        # Unescape
-        content = content.replace("\\'", "'").replace('\\"', '"').replace("\\n", "\n")
-        print(f"  -> type({repr(content[:50])}...)")
-        # Use pbcopy + cmd-v for reliable text input
-        proc = subprocess.run(["/usr/bin/pbcopy"], input=content.encode(), capture_output=True)
-        subprocess.run([
-            "/usr/bin/osascript", "-e",
-            'tell application "System Events" to keystroke "v" using command down'
-        ])
-        return False, "type", note or "type"
+    handler = ACTION_HANDLERS.get(action_str.partition("(")[0])
+    if handler is not None:
+        result = handler(action_str, screen_w, screen_h, scale)
+        if result is not None:
+            return result
 
     print(f"  [?] Could not parse action: {action_str}", file=sys.stderr)
     return False, "unknown", "unknown action"
@@ -679,13 +1254,33 @@ def main():
                         help="Disable guard that prevents sending inputs while the launch app is frontmost")
     parser.add_argument("--allow-dangerous", action="store_true",
                         help="Allow potentially destructive hotkeys like cmd+w/cmd+q even without close/quit intent")
+    parser.add_argument("--samples", type=int, default=1,
+                        help="Completions per step, sampled in one batched request; the majority action is executed")
+    parser.add_argument("--sample-temperature", type=float, default=None,
+                        help="Sampling temperature when --samples > 1 (default 0.7; 0 with a single sample)")
+    parser.add_argument("--serve-image", action="store_true",
+                        help="Serve screenshots from a loopback HTTP server and send vLLM the URL "
+                             "instead of inline base64 (vLLM must run on this machine)")
+    parser.add_argument("--serve-image-port", type=int, default=0,
+                        help="Port for --serve-image (default: pick a free port)")
     args = parser.parse_args()
+    if args.samples < 1:
+        parser.error("--samples must be >= 1")
+    sample_temperature = args.sample_temperature
+    if sample_temperature is None:
+        sample_temperature = 0.7 if args.samples > 1 else 0.0
 
     screen_w, screen_h, screen_scale = get_screen_size()
     print(f"[agent] Screen: {screen_w}x{screen_h} (scale={screen_scale})")
     print(f"[agent] Model: {MODEL} @ {VLLM_URL}")
     print(f"[agent] Task: {args.instruction}")
     print(f"[agent] Max steps: {args.max_steps}")
+    if args.samples > 1:
+        print(f"[agent] Samples per step: {args.samples} (temperature={sample_temperature})")
+    image_server = None
+    if args.serve_image:
+        image_server = ScreenshotServer(port=args.serve_image_port)
+        print(f"[agent] Serving screenshots at http://{image_server.host}:{image_server.port}/latest.png")
     prot_name, prot_bundle, prot_pid = get_frontmost_app()
     print(f"[agent] Protected frontmost: {prot_name} ({prot_bundle}, pid={prot_pid})")
     print()
@@ -708,6 +1303,7 @@ def main():
         "last_opened_app": None,
         "allow_dangerous": args.allow_dangerous or (os.environ.get("SEQ_AGENT_ALLOW_DANGEROUS") == "1"),
         "wait_s": args.wait_seconds,
+        "seq_conn": SeqdConnection(SEQ_SOCKET),
     }
 
     if not args.no_autofocus:
@@ -718,19 +1314,32 @@ def main():
                 parse_and_execute.state["last_opened_app"] = target
                 print(f"[agent] Autofocus: {target} (frontmost={ok})")
     folder_name = parse_folder_name(args.instruction)
+    system_msg = build_system_message(args.instruction)
+
+    # Dry runs never act on the UI, so the next step's screenshot can be captured while the
+    # model is still answering. Live steps must capture after acting, so they stay serial.
+    capture_pool = ThreadPoolExecutor(max_workers=1) if args.dry_run else None
+    prefetched = None  # Future for the next step's screenshot
 
     for step in range(1, args.max_steps + 1):
         print(f"--- Step {step}/{args.max_steps} ---")
 
         # Take screenshot
-        screenshot_b64 = take_screenshot()
-        if not screenshot_b64:
+        if prefetched is not None:
+            screenshot_png = prefetched.result()
+            prefetched = None
+        else:
+            screenshot_png = capture_png()
+        if not screenshot_png:
             print("[!] Failed to take screenshot, retrying...")
             time.sleep(2)
-            screenshot_b64 = take_screenshot()
-            if not screenshot_b64:
+            screenshot_png = capture_png()
+            if not screenshot_png:
                 print("[!] Screenshot failed again, aborting.")
                 break
+        image = screenshot_png
+        if image_server is not None:
+            image = image_server.publish(screenshot_png)
 
         # Build history text
         history_text = ""
@@ -742,7 +1351,12 @@ def main():
 
         # Query UI-TARS
         print("  Querying UI-TARS...")
-        response = query_ui_tars(args.instruction, screenshot_b64, history_text)
+        if capture_pool is not None:
+            prefetched = capture_pool.submit(capture_png)
+        # Don't hold seqd's single stream slot while waiting on the model.
+        parse_and_execute.state["seq_conn"].close()
+        response = query_ui_tars(system_msg, image, history_text,
+                                 samples=args.samples, temperature=sample_temperature)
         if not response:
             print("[!] No response from model, retrying...")
             time.sleep(2)
@@ -780,6 +1394,9 @@ def main():
                 ok = nudge_finder_rename(folder_name)
                 history.append(f"AutoNudge: Finder rename selection -> {folder_name} (ok={ok})")
                 consecutive_wait = 0
+        # The step's seq actions (including any nudge) are done; release seqd
+        # while the UI settles.
+        parse_and_execute.state["seq_conn"].close()
 
         # Guardrail: detect unknown/unparseable actions
         if action_type == "unknown":
@@ -799,7 +1416,8 @@ def main():
                 print(f"\n[agent] Aborting: same action repeated {MAX_REPEAT} times: {tail[0][:80]}")
                 return 1
 
-        time.sleep(args.delay)
+        # Let the UI react to the action; move on as soon as it has settled.
+        wait_for_screen_change(args.delay)
 
     print(f"\n[agent] Reached max steps ({args.max_steps}).")
     return 1
@@ -7,25 +7,48 @@ The daemon tails JSONL sessions from:
 
 It emits normalized seq.mem_events rows (`name=agent.qa.pair`) to `SEQ_CH_MEM_PATH`.
 Each row's `subject` is compact JSON with anonymized training payload.
+
+When `watchfiles` is installed, changed files are picked up from FSEvents/inotify
+notifications; otherwise the daemon polls every `--poll-seconds`.
 """
 
 from __future__ import annotations
 
 import argparse
+import calendar
 import hashlib
 import json
 import os
+import queue
+import re
 import signal
 import subprocess
 import sys
+import threading
 import time
-from dataclasses import dataclass
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 from seq_mem_sink import append_seq_mem_rows
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - optional dependency
+    psutil = None
+
+try:
+    from watchfiles import watch
+except ImportError:  # pragma: no cover - optional dependency
+    watch = None
+
 DEFAULT_CLAUDE_DIR = str(Path("~/.claude/projects").expanduser())
 DEFAULT_CODEX_DIR = str(Path("~/.codex/sessions").expanduser())
 DEFAULT_SEQ_MEM_PATH = str(
@@ -35,9 +58,81 @@ DEFAULT_STATE_PATH = str(Path("~/.local/state/seq/agent_qa_ingest_state.json").e
 DEFAULT_PIDFILE = str(Path("~/.local/state/seq/agent_qa_ingest.pid").expanduser())
 DEFAULT_LOG_PATH = str(Path("~/code/seq/cli/cpp/out/logs/agent_qa_ingest.log").expanduser())
 DEFAULT_ZVEC_JSONL = str(Path("~/repos/alibaba/zvec/data/agent_qa.jsonl").expanduser())
+READ_CHUNK_BYTES = 1 << 20
+MAX_PENDING_USERS = 100_000
+MAX_SEEN_EVENT_IDS = 200_000
+MAX_SUBJECT_PREFIXES = 10_000
+# Every str.splitlines() boundary maps to one space. That is exactly what
+# joining the lines with spaces did, but done in a single C-level pass.
+_LINE_BREAKS_TO_SPACE = str.maketrans(dict.fromkeys("\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029", " "))
+
+# Cheap pre-decode filters over raw line bytes. A line that misses its agent's
+# pattern cannot produce a message or session-meta record, so it is dropped
+# before JSON decoding. Matches still go through the full checks after decode.
+_CLAUDE_LINE_RE = re.compile(rb'"type"\s*:\s*"(?:user|assistant)"')
+_CODEX_LINE_RE = re.compile(rb'"type"\s*:\s*"message"|"(?:id|git)"\s*:')
+
+
+def _json_dumps(obj: Any) -> str:
+    # Always stdlib: subjects must stay byte-identical whether or not orjson
+    # is installed.
+    return json.dumps(obj, ensure_ascii=True)
 
 
-@dataclass
+# Separator between members of two _json_dumps outputs spliced into one object.
+_JSON_ITEM_SEP = ", "
+
+
+def _jsonl_bytes(rows: list[dict[str, Any]]) -> bytes:
+    return ("\n".join(json.dumps(row, ensure_ascii=True) for row in rows) + "\n").encode("utf-8")
+
+
+def _json_loads_line(line: bytes) -> Any:
+    """Decode one JSONL line; returns None for blank lines.
+
+    orjson parses the raw bytes directly. Lines it rejects (blank or not valid
+    UTF-8) take the lenient stdlib path, so behavior matches either way.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass
+    raw = line.decode("utf-8", errors="replace").strip()
+    if not raw:
+        return None
+    return json.loads(raw)
+
+
+def _parse_iso_utc_ms(raw: str) -> int | None:
+    """Fast path for `YYYY-MM-DDTHH:MM:SS[.fff|.ffffff]Z`, the shape both agents log.
+
+    Slices fields by position instead of building a datetime. The result is
+    the same as `int(datetime.fromisoformat(...).timestamp() * 1000)`, float
+    rounding included. Returns None for any other shape.
+    """
+    n = len(raw)
+    if n not in (20, 24, 27) or raw[-1] != "Z" or raw[4] != "-" or raw[10] != "T":
+        return None
+    if n != 20 and raw[19] != ".":
+        return None
+    try:
+        year = int(raw[0:4])
+        month = int(raw[5:7])
+        day = int(raw[8:10])
+        hour = int(raw[11:13])
+        minute = int(raw[14:16])
+        second = int(raw[17:19])
+        micro = int(raw[20:-1].ljust(6, "0")) if n != 20 else 0
+    except ValueError:
+        return None
+    if not (1 <= month <= 12 and 1 <= day <= 31 and hour < 24 and minute < 60 and second < 60):
+        return None
+    secs = calendar.timegm((year, month, day, hour, minute, second))
+    return int((secs * 1_000_000 + micro) / 1_000_000 * 1000)
+
+
+@dataclass(slots=True)
 class Config:
     claude_dir: Path
     codex_dir: Path
@@ -50,26 +145,65 @@ class Config:
     rescan_seconds: float
     flush_every: int
     max_text_chars: int
+    max_bytes_per_tick: int
     backfill: bool
     include_text: bool
     reset_state: bool
 
 
+@dataclass(slots=True)
+class FileCtx:
+    """Per-file constants for `_parse_line`, computed once per `_process_file`."""
+
+    source_path: str
+    agent: str
+    default_session_id: str
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class EmittedPair:
+    """A seq mem row plus the subject dict it was serialized from."""
+
+    row: dict[str, Any]
+    subject_obj: dict[str, Any]
+
+
 class Ingestor:
     def __init__(self, cfg: Config) -> None:
         self.cfg = cfg
+        self._seq_mem_resolved = cfg.seq_mem_path.resolve()
         self.stop_requested = False
+        self._stop_event = threading.Event()
         self.offsets: dict[str, int] = {}
+        # Set whenever offsets change so idle flushes skip the state write.
+        self._offsets_dirty = False
         self.file_meta: dict[str, dict[str, Any]] = {}
-        self.pending_user: dict[str, dict[str, Any]] = {}
+        self.pending_user: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        # Recently emitted event ids (LRU) so a re-read stretch of a session file
+        # (truncated/rewritten in place) doesn't re-emit the same pairs.
+        # Keyed on the per-source identity, not content: other sessions may
+        # legitimately ask and answer the same text.
+        self._seen_event_ids: OrderedDict[str, None] = OrderedDict()
+        # Serialized per-session subject head (`{...` without the closing brace), LRU.
+        self._subject_prefixes: OrderedDict[tuple[str, str, str, str], str] = OrderedDict()
         self.rows_emitted = 0
         self.rows_skipped = 0
         self.files_seen = 0
         self.last_rescan = 0.0
         self.watched_files: list[Path] = []
+        # Sink writes run on this thread during `run`; None means write inline.
+        self._writer: threading.Thread | None = None
+        self._write_q: queue.Queue[list[EmittedPair] | None] = queue.Queue()
+        # First sink failure seen by the writer thread; re-raised on the main
+        # thread so offsets are never saved past rows that were not written.
+        self._write_error: Exception | None = None
+        # Files that stopped at max_bytes_per_tick and still have unread lines.
+        self.backlog_files: set[Path] = set()
 
     def request_stop(self, _signum: int, _frame: Any) -> None:
         self.stop_requested = True
+        self._stop_event.set()
 
     def load_state(self) -> None:
         path = self.cfg.state_path
@@ -89,23 +223,38 @@ class Ingestor:
                     clean[key] = value
             self.offsets = clean
 
+    def reset_offsets(self) -> None:
+        self.offsets = {}
+        self._offsets_dirty = True
+
     def save_state(self) -> None:
-        self.cfg.state_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self._offsets_dirty:
+            return
+        if self._writer is not None:
+            # Never persist offsets past rows still waiting in the write queue.
+            self._write_q.join()
+        self._raise_write_error()
+        path = self.cfg.state_path
+        path.parent.mkdir(parents=True, exist_ok=True)
         payload = {
             "schema_version": "agent_qa_ingest_state_v1",
             "updated_at": datetime.now(timezone.utc).isoformat(),
             "offsets": self.offsets,
         }
-        self.cfg.state_path.write_text(json.dumps(payload, ensure_ascii=True, indent=2) + "\n", encoding="utf-8")
+        blob = (json.dumps(payload, ensure_ascii=True, indent=2) + "\n").encode("utf-8")
+        # Write-then-rename so a kill mid-write never leaves a truncated state file.
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with tmp.open("wb") as fh:
+            fh.write(blob)
+        os.replace(tmp, path)
+        self._offsets_dirty = False
 
     def discover_files(self) -> list[Path]:
         out: list[Path] = []
         for root in (self.cfg.claude_dir, self.cfg.codex_dir):
             if not root.exists():
                 continue
-            for path in root.rglob("*.jsonl"):
-                if path.is_file():
-                    out.append(path)
+            out.extend(_walk_jsonl(root))
         out.sort()
         return out
 
@@ -130,6 +279,9 @@ class Ingestor:
             return int(value * 1000)
         if isinstance(value, str) and value.strip():
             raw = value.strip()
+            fast = _parse_iso_utc_ms(raw)
+            if fast is not None:
+                return fast
             try:
                 if raw.endswith("Z"):
                     raw = raw[:-1] + "+00:00"
@@ -140,7 +292,7 @@ class Ingestor:
         return int(time.time() * 1000)
 
     def sanitize_text(self, text: str) -> str:
-        value = " ".join(text.replace("\r", "\n").splitlines()).strip()
+        value = text.translate(_LINE_BREAKS_TO_SPACE).strip()
         if not value:
             return ""
         if len(value) > self.cfg.max_text_chars:
@@ -228,6 +380,24 @@ class Ingestor:
         raw = f"q:{question}\na:{answer}"
         return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
+    def _subject_prefix(self, agent: str, session_id: str, project_path: str, source_path: str) -> str:
+        key = (agent, session_id, project_path, source_path)
+        prefix = self._subject_prefixes.get(key)
+        if prefix is not None:
+            self._subject_prefixes.move_to_end(key)
+            return prefix
+        head = {
+            "agent": agent,
+            "session_id": session_id,
+            "project_path": project_path,
+            "source_path": source_path,
+        }
+        prefix = _json_dumps(head)[:-1]
+        self._subject_prefixes[key] = prefix
+        if len(self._subject_prefixes) > MAX_SUBJECT_PREFIXES:
+            self._subject_prefixes.popitem(last=False)
+        return prefix
+
     def _emit_pair(
         self,
         *,
@@ -240,9 +410,18 @@ class Ingestor:
         question: str,
         answer: str,
         model: str,
-    ) -> dict[str, Any]:
+    ) -> EmittedPair | None:
         event_id = self._make_event_id(agent, source_path, source_offset, session_id)
+        if event_id in self._seen_event_ids:
+            self._seen_event_ids.move_to_end(event_id)
+            self.rows_skipped += 1
+            return None
+        self._seen_event_ids[event_id] = None
+        if len(self._seen_event_ids) > MAX_SEEN_EVENT_IDS:
+            self._seen_event_ids.popitem(last=False)
         content_hash = self._make_content_hash(question, answer)
+        question_text = question if self.cfg.include_text else ""
+        answer_text = answer if self.cfg.include_text else ""
         subject_obj = {
             "agent": agent,
             "session_id": session_id,
@@ -250,11 +429,23 @@ class Ingestor:
             "source_path": source_path,
             "offset": source_offset,
             "model": model,
-            "question": question if self.cfg.include_text else "",
-            "answer": answer if self.cfg.include_text else "",
+            "question": question_text,
+            "answer": answer_text,
             "question_chars": len(question),
             "answer_chars": len(answer),
         }
+        # Only the per-pair tail is encoded; the session fields come from cache.
+        prefix = self._subject_prefix(agent, session_id, project_path, source_path)
+        tail = _json_dumps(
+            {
+                "offset": source_offset,
+                "model": model,
+                "question": question_text,
+                "answer": answer_text,
+                "question_chars": len(question),
+                "answer_chars": len(answer),
+            }
+        )
         row = {
             "ts_ms": int(ts_ms),
             "dur_us": 0,
@@ -263,37 +454,41 @@ class Ingestor:
             "event_id": event_id,
             "content_hash": content_hash,
             "name": "agent.qa.pair",
-            "subject": json.dumps(subject_obj, ensure_ascii=True),
+            "subject": prefix + _JSON_ITEM_SEP + tail[1:],
         }
-        return row
+        return EmittedPair(row=row, subject_obj=subject_obj)
 
-    def _parse_line(self, path: Path, offset: int, line: bytes) -> list[dict[str, Any]]:
-        raw = line.decode("utf-8", errors="replace").strip()
-        if not raw:
-            return []
+    def _file_ctx(self, path: Path) -> FileCtx:
+        source_path = str(path)
+        is_claude = "/.claude/" in source_path or source_path.startswith(str(self.cfg.claude_dir))
+        return FileCtx(
+            source_path=source_path,
+            agent="claude" if is_claude else "codex",
+            default_session_id=path.stem,
+            meta=self.file_meta.setdefault(source_path, {}),
+        )
+
+    def _parse_line(self, ctx: FileCtx, offset: int, line: bytes) -> list[EmittedPair]:
+        is_claude = ctx.agent == "claude"
         try:
-            obj = json.loads(raw)
+            obj = _json_loads_line(line)
         except json.JSONDecodeError:
             self.rows_skipped += 1
             return []
+        if obj is None:
+            return []
         if not isinstance(obj, dict):
             self.rows_skipped += 1
             return []
 
-        source_path = str(path)
-        claude_root = str(self.cfg.claude_dir)
-        is_claude = "/.claude/" in source_path or source_path.startswith(claude_root)
-        agent = "claude" if is_claude else "codex"
-        file_key = source_path
-        meta = self.file_meta.get(file_key, {})
-        out_rows: list[dict[str, Any]] = []
+        agent = ctx.agent
+        meta = ctx.meta
+        out_rows: list[EmittedPair] = []
 
-        default_session_id = path.stem
+        default_session_id = ctx.default_session_id
 
         if not is_claude and obj.get("type") is None and ("id" in obj or "git" in obj):
-            parsed_meta = self._extract_codex_meta(obj, default_session_id)
-            meta.update(parsed_meta)
-            self.file_meta[file_key] = meta
+            meta.update(self._extract_codex_meta(obj, default_session_id))
             return out_rows
 
         if is_claude:
@@ -331,10 +526,10 @@ class Ingestor:
                 "project_path": project_path,
                 "model": model,
             }
-            if len(self.pending_user) > 100_000:
-                # Bound memory in pathological cases.
-                for stale_key in list(self.pending_user.keys())[:10_000]:
-                    self.pending_user.pop(stale_key, None)
+            self.pending_user.move_to_end(key)
+            # Bound memory in pathological cases by dropping the stalest sessions.
+            while len(self.pending_user) > MAX_PENDING_USERS:
+                self.pending_user.popitem(last=False)
             return out_rows
 
         pending = self.pending_user.pop(key, None)
@@ -347,135 +542,269 @@ class Ingestor:
             return out_rows
 
         pair_ts = max(int(pending.get("ts_ms") or 0), ts_ms)
-        row = self._emit_pair(
+        pair = self._emit_pair(
             ts_ms=pair_ts,
             agent=agent,
             session_id=session_id,
             project_path=project_path or str(pending.get("project_path") or ""),
-            source_path=source_path,
+            source_path=ctx.source_path,
             source_offset=offset,
             question=question,
             answer=answer,
             model=model or str(pending.get("model") or ""),
         )
-        out_rows.append(row)
+        if pair is not None:
+            out_rows.append(pair)
         return out_rows
 
     def _append_jsonl(self, path: Path, rows: list[dict[str, Any]]) -> None:
         if not rows:
             return
-        if path.resolve() == self.cfg.seq_mem_path.resolve():
+        if path is self.cfg.seq_mem_path or path.resolve() == self._seq_mem_resolved:
             append_seq_mem_rows(rows, local_path=path)
             return
         path.parent.mkdir(parents=True, exist_ok=True)
-        with path.open("a", encoding="utf-8") as fh:
-            for row in rows:
-                fh.write(json.dumps(row, ensure_ascii=True))
-                fh.write("\n")
+        blob = _jsonl_bytes(rows)
+        with path.open("ab") as fh:
+            fh.write(blob)
 
-    def _append_zvec_jsonl(self, rows: list[dict[str, Any]]) -> None:
-        if not rows or not self.cfg.zvec_jsonl:
+    def _append_zvec_jsonl(self, pairs: list[EmittedPair]) -> None:
+        if not pairs or not self.cfg.zvec_jsonl:
             return
         out: list[dict[str, Any]] = []
-        for row in rows:
-            if row.get("name") != "agent.qa.pair":
-                continue
-            try:
-                subject = json.loads(str(row.get("subject") or "{}"))
-            except json.JSONDecodeError:
-                continue
-            if not isinstance(subject, dict):
-                continue
-            q = str(subject.get("question") or "")
-            a = str(subject.get("answer") or "")
+        for pair in pairs:
+            # Read the in-memory subject rather than re-parsing row["subject"].
+            subject = pair.subject_obj
+            q = subject["question"]
+            a = subject["answer"]
             if not q or not a:
                 continue
             out.append(
                 {
-                    "id": str(row.get("event_id") or ""),
+                    "id": pair.row["event_id"],
                     "text": f"Question: {q}\n\nAnswer: {a}",
                     "metadata": {
-                        "agent": subject.get("agent", ""),
-                        "session_id": subject.get("session_id", ""),
-                        "project_path": subject.get("project_path", ""),
-                        "source_path": subject.get("source_path", ""),
-                        "ts_ms": row.get("ts_ms", 0),
+                        "agent": subject["agent"],
+                        "session_id": subject["session_id"],
+                        "project_path": subject["project_path"],
+                        "source_path": subject["source_path"],
+                        "ts_ms": pair.row["ts_ms"],
                     },
                 }
             )
         if out:
             self._append_jsonl(self.cfg.zvec_jsonl, out)
 
-    def _process_file(self, path: Path) -> int:
+    def _process_file(self, path: Path) -> list[EmittedPair]:
         key = str(path)
         try:
             size = path.stat().st_size
         except FileNotFoundError:
-            self.offsets.pop(key, None)
-            return 0
+            self.backlog_files.discard(path)
+            if self.offsets.pop(key, None) is not None:
+                self._offsets_dirty = True
+            return []
 
         if key not in self.offsets:
+            self._offsets_dirty = True
             if self.cfg.backfill:
                 self.offsets[key] = 0
             else:
                 self.offsets[key] = size
-                return 0
+                self.backlog_files.discard(path)
+                return []
 
         offset = self.offsets.get(key, 0)
         if size < offset:
             offset = 0
 
         if size == offset:
-            return 0
-
-        emitted_rows: list[dict[str, Any]] = []
-        new_offset = offset
-
-        with path.open("rb") as fh:
-            fh.seek(offset)
-            chunk = fh.read()
-
-        if not chunk:
-            self.offsets[key] = size
-            return 0
+            self.backlog_files.discard(path)
+            return []
 
-        parts = chunk.split(b"\n")
-        # Always drop the trailing split fragment:
-        # - if chunk ends with newline, it's an empty sentinel
-        # - otherwise it's an incomplete partial line
-        complete = parts[:-1]
+        emitted_rows: list[EmittedPair] = []
+        cap = self.cfg.max_bytes_per_tick
         cursor = offset
-        for line in complete:
-            line_offset = cursor
-            cursor += len(line) + 1
-            if not line:
+        ctx = self._file_ctx(path)
+        # Filter before the _parse_line call so skipped lines cost one C scan.
+        prefilter = (_CLAUDE_LINE_RE if ctx.agent == "claude" else _CODEX_LINE_RE).search
+        for line_offset, line in self._iter_lines_from(path, offset, cap):
+            cursor = line_offset + len(line) + 1
+            if not line or prefilter(line) is None:
                 continue
-            rows = self._parse_line(path, line_offset, line)
+            rows = self._parse_line(ctx, line_offset, line)
             if rows:
                 emitted_rows.extend(rows)
 
-        new_offset = cursor
-        self.offsets[key] = new_offset
+        if cursor != self.offsets[key]:
+            self.offsets[key] = cursor
+            self._offsets_dirty = True
+        # The cap is checked per read block, so a pass can finish the file
+        # even when more than `cap` bytes were pending; only unread complete
+        # lines keep it in the backlog (an unterminated tail leaves cursor ==
+        # offset on the next pass).
+        if cap and offset < cursor < size:
+            self.backlog_files.add(path)
+        else:
+            self.backlog_files.discard(path)
+        return emitted_rows
+
+    def _iter_lines_from(self, path: Path, offset: int, max_bytes: int) -> Iterator[tuple[int, bytes]]:
+        """Yield `(offset, line)` for each complete line after `offset`.
+
+        Reads in READ_CHUNK_BYTES blocks and carries the partial tail between
+        blocks, so memory stays bounded by one block plus the longest line.
+        Stops reading new blocks past `max_bytes` (0 = no cap) once at least
+        one line has been yielded. Empty lines are yielded too so callers can
+        advance past them; an unterminated final line is never yielded.
+        """
+        try:
+            fh = path.open("rb")
+        except FileNotFoundError:
+            return
+        with fh:
+            fh.seek(offset)
+            base = offset
+            buf = b""
+            read_total = 0
+            while not (max_bytes and read_total >= max_bytes and base > offset):
+                block = fh.read(READ_CHUNK_BYTES)
+                if not block:
+                    break
+                read_total += len(block)
+                buf = buf + block if buf else block
+                pos = 0
+                while True:
+                    nl = buf.find(b"\n", pos)
+                    if nl < 0:
+                        break
+                    yield base + pos, buf[pos:nl]
+                    pos = nl + 1
+                if pos:
+                    buf = buf[pos:]
+                    base += pos
+
+    def _process_paths(self, paths: Iterable[Path]) -> int:
+        # Collect the whole tick's rows so each sink is opened once per tick.
+        pending_sink: list[EmittedPair] = []
+        for path in paths:
+            pending_sink.extend(self._process_file(path))
+        if pending_sink:
+            self._raise_write_error()
+            if self._writer is not None:
+                self._write_q.put(pending_sink)
+            else:
+                self._write_pairs(pending_sink)
+            self.rows_emitted += len(pending_sink)
+        return len(pending_sink)
+
+    def _write_pairs(self, pairs: list[EmittedPair]) -> None:
+        self._append_jsonl(self.cfg.seq_mem_path, [pair.row for pair in pairs])
+        self._append_zvec_jsonl(pairs)
+
+    def _writer_loop(self) -> None:
+        while True:
+            pairs = self._write_q.get()
+            try:
+                if pairs is None:
+                    return
+                # After a failure, later batches are dropped too: the state is
+                # not saved past the failed batch, so they get re-read on restart.
+                if self._write_error is None:
+                    self._write_pairs(pairs)
+            except Exception as exc:
+                print(f"[agent-qa-ingest] sink write failed: {exc}", flush=True)
+                self._write_error = exc
+            finally:
+                self._write_q.task_done()
+
+    def _raise_write_error(self) -> None:
+        if self._write_error is not None:
+            raise self._write_error
+
+    def _start_writer(self) -> None:
+        self._writer = threading.Thread(target=self._writer_loop, name="agent-qa-writer", daemon=True)
+        self._writer.start()
+
+    def _stop_writer(self) -> None:
+        if self._writer is None:
+            return
+        self._write_q.put(None)
+        self._writer.join()
+        self._writer = None
+
+    def _drain_backlog(self) -> None:
+        while self.backlog_files and not self.stop_requested:
+            self._log_tick(self._process_paths(sorted(self.backlog_files)))
+            self.save_state()
+
+    def _log_tick(self, emitted: int) -> None:
+        if emitted > 0:
+            print(
+                "[agent-qa-ingest] "
+                f"emitted={emitted} total={self.rows_emitted} files={self.files_seen}",
+                flush=True,
+            )
+
+    def _poll_loop(self) -> None:
+        ticks = 0
+        while not self.stop_requested:
+            self.rescan_if_needed(force=False)
+            self._log_tick(self._process_paths(self.watched_files))
+
+            ticks += 1
+            if ticks % max(1, self.cfg.flush_every) == 0:
+                self.save_state()
+
+            if not self.backlog_files:
+                time.sleep(max(0.2, self.cfg.poll_seconds))
+
+    def _watch_loop(self, roots: list[Path]) -> None:
+        """Process session files as FSEvents/inotify report them changed.
 
-        if emitted_rows:
-            self._append_jsonl(self.cfg.seq_mem_path, emitted_rows)
-            self._append_zvec_jsonl(emitted_rows)
-            self.rows_emitted += len(emitted_rows)
+        Catches up on everything once, then only touches paths watchfiles
+        yields. An empty batch every `rescan_seconds` doubles as the idle
+        housekeeping tick (rescan + state flush). Deleted files fall through
+        `_process_file`, which drops their offsets.
+        """
+        print(f"[agent-qa-ingest] watching: {', '.join(str(root) for root in roots)}", flush=True)
+        self.rescan_if_needed(force=True)
+        self._log_tick(self._process_paths(self.watched_files))
+        self._drain_backlog()
 
-        return len(emitted_rows)
+        ticks = 0
+        for changes in watch(
+            *roots,
+            stop_event=self._stop_event,
+            rust_timeout=int(self.cfg.rescan_seconds * 1000),
+            yield_on_timeout=True,
+            debounce=50,
+            step=50,
+        ):
+            if not changes:
+                self.rescan_if_needed(force=False)
+                self.save_state()
+                continue
+            changed = sorted({Path(raw) for _change, raw in changes if raw.endswith(".jsonl")})
+            self._log_tick(self._process_paths(changed))
+            self._drain_backlog()
+
+            ticks += 1
+            if ticks % max(1, self.cfg.flush_every) == 0:
+                self.save_state()
 
     def run_once(self) -> int:
         self.rescan_if_needed(force=True)
-        emitted = 0
-        for path in self.watched_files:
-            emitted += self._process_file(path)
+        emitted = self._process_paths(self.watched_files)
+        while self.backlog_files:
+            emitted += self._process_paths(sorted(self.backlog_files))
         self.save_state()
         return emitted
 
     def run_forever(self) -> int:
         self.load_state()
         if self.cfg.reset_state:
-            self.offsets = {}
+            self.reset_offsets()
             print(
                 f"[agent-qa-ingest] reset-state enabled: {self.cfg.state_path}",
                 flush=True,
@@ -494,25 +823,17 @@ class Ingestor:
         if self.cfg.zvec_jsonl:
             print(f"[agent-qa-ingest] zvec_jsonl={self.cfg.zvec_jsonl}", flush=True)
 
-        ticks = 0
-        while not self.stop_requested:
-            self.rescan_if_needed(force=False)
-            emitted_this_tick = 0
-            for path in self.watched_files:
-                emitted_this_tick += self._process_file(path)
-
-            ticks += 1
-            if ticks % max(1, self.cfg.flush_every) == 0:
-                self.save_state()
-
-            if emitted_this_tick > 0:
-                print(
-                    "[agent-qa-ingest] "
-                    f"emitted={emitted_this_tick} total={self.rows_emitted} files={self.files_seen}",
-                    flush=True,
-                )
-
-            time.sleep(max(0.2, self.cfg.poll_seconds))
+        # Parsing continues on this thread while the writer thread appends the
+        # previous batch to the sinks.
+        self._start_writer()
+        roots = [root for root in (self.cfg.claude_dir, self.cfg.codex_dir) if root.exists()]
+        try:
+            if watch is not None and roots:
+                self._watch_loop(roots)
+            else:
+                self._poll_loop()
+        finally:
+            self._stop_writer()
 
         self.save_state()
         print(
@@ -522,6 +843,31 @@ class Ingestor:
         return 0
 
 
+def _walk_jsonl(root: Path) -> Iterator[Path]:
+    """Yield `*.jsonl` files under `root`.
+
+    Uses os.scandir, which gets the file type from the directory entry, so a
+    rescan does not stat every session file. Directory symlinks are not
+    followed, matching Path.rglob.
+    """
+    stack = [str(root)]
+    while stack:
+        current = stack.pop()
+        try:
+            it = os.scandir(current)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".jsonl") and entry.is_file():
+                        yield Path(entry.path)
+                except OSError:
+                    continue
+
+
 def _is_pid_alive(pid: int) -> bool:
     if pid <= 0:
         return False
@@ -532,15 +878,33 @@ def _is_pid_alive(pid: int) -> bool:
     except PermissionError:
         return False
 
+    cmd = _pid_command(pid)
+    if cmd is None:
+        return False
+    return "agent_qa_ingest.py" in cmd and (" run " in cmd or cmd.endswith(" run"))
+
+
+def _pid_command(pid: int) -> str | None:
+    """Return the command line of `pid` without forking when possible."""
+    if sys.platform.startswith("linux"):
+        try:
+            raw = Path(f"/proc/{pid}/cmdline").read_bytes()
+        except OSError:
+            return None
+        return raw.replace(b"\x00", b" ").decode("utf-8", "replace").strip()
+    if psutil is not None:
+        try:
+            return " ".join(psutil.Process(pid).cmdline())
+        except (psutil.Error, OSError):
+            return None
     proc = subprocess.run(
         ["ps", "-p", str(pid), "-o", "command="],
         text=True,
         capture_output=True,
     )
     if proc.returncode != 0:
-        return False
-    cmd = proc.stdout.strip()
-    return "agent_qa_ingest.py" in cmd and (" run " in cmd or cmd.endswith(" run"))
+        return None
+    return proc.stdout.strip()
 
 
 def _read_pid(pidfile: Path) -> int:
@@ -584,6 +948,8 @@ def cmd_start(cfg: Config, args: argparse.Namespace) -> int:
         str(cfg.flush_every),
         "--max-text-chars",
         str(cfg.max_text_chars),
+        "--max-bytes-per-tick",
+        str(cfg.max_bytes_per_tick),
         "--claude-dir",
         str(cfg.claude_dir),
         "--codex-dir",
@@ -680,6 +1046,7 @@ def build_config(args: argparse.Namespace) -> Config:
         rescan_seconds=max(2.0, float(args.rescan_seconds)),
         flush_every=max(1, int(args.flush_every)),
         max_text_chars=max(256, min(100_000, int(args.max_text_chars))),
+        max_bytes_per_tick=max(0, int(args.max_bytes_per_tick)),
         backfill=bool(args.backfill),
         include_text=bool(args.include_text),
         reset_state=bool(args.reset_state),
@@ -720,6 +1087,7 @@ def add_common_args(parser: argparse.ArgumentParser) -> None:
         "--poll-seconds",
         type=float,
         default=float(os.environ.get("SEQ_AGENT_QA_POLL_SECONDS", "1.0")),
+        help="Poll interval when watchfiles is not installed.",
     )
     parser.add_argument(
         "--rescan-seconds",
@@ -736,6 +1104,12 @@ def add_common_args(parser: argparse.ArgumentParser) -> None:
         type=int,
         default=int(os.environ.get("SEQ_AGENT_QA_MAX_TEXT_CHARS", "8000")),
     )
+    parser.add_argument(
+        "--max-bytes-per-tick",
+        type=int,
+        default=int(os.environ.get("SEQ_AGENT_QA_MAX_BYTES_PER_TICK", str(32 * 1024 * 1024))),
+        help="Max bytes read from one file per tick before yielding (0 = unlimited).",
+    )
     parser.add_argument("--backfill", action="store_true")
     parser.add_argument(
         "--reset-state",
@@ -788,7 +1162,7 @@ def main() -> int:
     if args.command == "once":
         ingestor.load_state()
         if cfg.reset_state:
-            ingestor.offsets = {}
+            ingestor.reset_offsets()
         emitted = ingestor.run_once()
         print(f"emitted_rows={emitted} files_seen={ingestor.files_seen}")
         return 0
@@ -2,65 +2,275 @@
 from __future__ import annotations
 
 import argparse
+import os
+import select
 import statistics
 import subprocess
 import sys
+import tempfile
 import time
-from typing import List
+from pathlib import Path
+from typing import List, Optional, Union
+
+try:
+    from AppKit import NSWorkspace, NSWorkspaceApplicationKey, NSWorkspaceDidActivateApplicationNotification
+    from Foundation import NSDate, NSDefaultRunLoopMode, NSRunLoop
+except ImportError:  # pyobjc is optional; fall back to polling osascript.
+    NSWorkspace = None
+
+FRONT_APP_SCRIPT = 'tell application "System Events" to name of first process whose frontmost is true'
+REPL_END_MARKER = "__END__"
 
 
 def run_cmd(args: List[str]) -> int:
-    return subprocess.call(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not hasattr(os, "posix_spawnp"):
+        return subprocess.call(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # posix_spawn skips subprocess's fork/preexec bookkeeping, which otherwise
+    # lands inside the measured dispatch time.
+    pid = os.posix_spawnp(
+        args[0],
+        args,
+        os.environ,
+        file_actions=[
+            (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+            (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0),
+        ],
+    )
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def activate_app(app: str, use_open: bool = False) -> None:
+    # In-process LaunchServices call; /usr/bin/open forks and re-resolves the bundle each time.
+    if not use_open and NSWorkspace is not None and NSWorkspace.sharedWorkspace().launchApplication_(app):
+        return
+    run_cmd(["/usr/bin/open", "-a", app])
+
+
+def _compiled_front_app_script() -> Optional[Path]:
+    """Compile FRONT_APP_SCRIPT to a .scpt once so osascript skips the parser per call."""
+    if hasattr(_compiled_front_app_script, "path"):
+        return _compiled_front_app_script.path
+    path: Optional[Path] = None
+    try:
+        out_dir = Path(tempfile.mkdtemp(prefix="bench_open_app_"))
+        src = out_dir / "front_app.applescript"
+        src.write_text(FRONT_APP_SCRIPT + "\n", encoding="utf-8")
+        compiled = out_dir / "front_app.scpt"
+        if run_cmd(["/usr/bin/osacompile", "-o", str(compiled), str(src)]) == 0 and compiled.exists():
+            path = compiled
+    except OSError:
+        path = None
+    _compiled_front_app_script.path = path
+    return path
 
 
 def front_app() -> str:
-    script = 'tell application "System Events" to name of first process whose frontmost is true'
-    out = subprocess.check_output(["/usr/bin/osascript", "-e", script], stderr=subprocess.DEVNULL)
+    compiled = _compiled_front_app_script()
+    args = ["/usr/bin/osascript", str(compiled)] if compiled else ["/usr/bin/osascript", "-e", FRONT_APP_SCRIPT]
+    out = subprocess.check_output(args, stderr=subprocess.DEVNULL)
     name = out.decode("utf-8").strip()
     if name == "missing value":
         return ""
     return name
 
 
-def wait_front(app: str, timeout_s: float) -> bool:
+def _clean_repl_line(line: str) -> str:
+    # `osascript -i` echoes prompts (">> ", "? ") and result arrows ("=> ") around values.
+    value = line.strip()
+    for prefix in (">>", "?", "=>"):
+        while value.startswith(prefix):
+            value = value[len(prefix):].lstrip()
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        value = value[1:-1]
+    return value
+
+
+class FrontAppProbe:
+    """Frontmost-app queries answered by one long-lived `osascript -i`.
+
+    Spawning osascript per poll costs tens of ms and registers a new process
+    with LaunchServices every time, which pollutes the very latency being
+    measured. Each query writes the script plus a sentinel line and reads
+    until the sentinel comes back. On any failure it falls back to front_app().
+    """
+
+    def __init__(self, reply_timeout_s: float = 2.0) -> None:
+        self.reply_timeout_s = reply_timeout_s
+        self.proc: Optional[subprocess.Popen] = None
+
+    def _ensure(self) -> subprocess.Popen:
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(
+                ["/usr/bin/osascript", "-i"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+            )
+        return self.proc
+
+    def query(self) -> str:
+        try:
+            proc = self._ensure()
+            assert proc.stdin is not None and proc.stdout is not None
+            proc.stdin.write(f'{FRONT_APP_SCRIPT}\nreturn "{REPL_END_MARKER}"\n'.encode("utf-8"))
+            fd = proc.stdout.fileno()
+            buf = b""
+            deadline = time.monotonic() + self.reply_timeout_s
+            while REPL_END_MARKER.encode() not in buf:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                    raise TimeoutError("osascript repl did not answer")
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    raise EOFError("osascript repl exited")
+                buf += chunk
+        except (OSError, TimeoutError, EOFError):
+            self.close()
+            return front_app()
+        lines = [_clean_repl_line(line) for line in buf.decode("utf-8", "replace").splitlines()]
+        lines = [line for line in lines if line and REPL_END_MARKER not in line]
+        name = lines[-1] if lines else ""
+        if name == "missing value":
+            return ""
+        return name
+
+    def close(self) -> None:
+        if self.proc is None:
+            return
+        try:
+            if self.proc.stdin is not None:
+                self.proc.stdin.close()
+            self.proc.wait(timeout=1.0)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+        self.proc = None
+
+
+class ActivationWatcher:
+    """Tracks the frontmost app from NSWorkspace activation notifications.
+
+    wait_for() spins the run loop until the observer reports the wanted app,
+    so the benchmark loop moves on as soon as activation is delivered instead
+    of at the next 10 ms poll tick. It only gates samples: bench_one still
+    times the command itself.
+
+    System Events (the polling path) reports the process name, which is the
+    executable name and can differ from NSRunningApplication.localizedName
+    (e.g. a localized or renamed bundle). Both names are accepted so the two
+    paths agree on what `--app` matches.
+    """
+
+    def __init__(self) -> None:
+        workspace = NSWorkspace.sharedWorkspace()
+        self.center = workspace.notificationCenter()
+        self.front = self._app_names(workspace.frontmostApplication())
+        self.token = self.center.addObserverForName_object_queue_usingBlock_(
+            NSWorkspaceDidActivateApplicationNotification, None, None, self._on_activate
+        )
+
+    @staticmethod
+    def _app_names(app) -> tuple[str, ...]:
+        if app is None:
+            return ()
+        names = [str(app.localizedName() or "")]
+        url = app.executableURL()
+        if url is not None:
+            names.append(str(url.lastPathComponent() or ""))
+        return tuple(name for name in names if name)
+
+    def _on_activate(self, note) -> None:
+        info = note.userInfo() or {}
+        self.front = self._app_names(info.get(NSWorkspaceApplicationKey))
+
+    def wait_for(self, app: str, timeout_s: float) -> bool:
+        end = time.monotonic() + timeout_s
+        run_loop = NSRunLoop.currentRunLoop()
+        while app not in self.front:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return False
+            handled = run_loop.runMode_beforeDate_(
+                NSDefaultRunLoopMode, NSDate.dateWithTimeIntervalSinceNow_(remaining)
+            )
+            if not handled:
+                # No run loop sources yet; don't spin.
+                time.sleep(0.001)
+        return True
+
+    def close(self) -> None:
+        self.center.removeObserver_(self.token)
+
+
+def wait_front(app: str, timeout_s: float, probe: Union[FrontAppProbe, ActivationWatcher, None] = None) -> bool:
+    if isinstance(probe, ActivationWatcher):
+        return probe.wait_for(app, timeout_s)
     end = time.monotonic() + timeout_s
     while time.monotonic() < end:
-        if front_app() == app:
+        current = probe.query() if probe is not None else front_app()
+        if current == app:
             return True
         time.sleep(0.01)
     return False
 
 
-def bench_one(label: str, run_args: List[str], target_app: str, baseline_app: str, iters: int, timeout_s: float, measure: str) -> List[float]:
-    times: List[float] = []
-    for _ in range(iters):
-        if measure == "focus":
-            run_cmd(["/usr/bin/open", "-a", baseline_app])
-            if not wait_front(baseline_app, timeout_s):
-                print(f"{label}: failed to reach baseline app '{baseline_app}'", file=sys.stderr)
-                continue
-        start = time.monotonic()
-        run_cmd(run_args)
-        end = time.monotonic()
-        if measure == "focus":
-            ok = wait_front(target_app, timeout_s)
-            if not ok:
-                print(f"{label}: timeout waiting for '{target_app}'", file=sys.stderr)
-                continue
-        times.append((end - start) * 1000.0)
-        time.sleep(0.05)
+def bench_one(
+    label: str,
+    run_args: List[str],
+    target_app: str,
+    baseline_app: str,
+    iters: int,
+    timeout_s: float,
+    measure: str,
+    use_open: bool = False,
+) -> List[int]:
+    """Return per-iteration dispatch times in integer nanoseconds."""
+    times: List[int] = []
+    probe: Union[FrontAppProbe, ActivationWatcher, None] = None
+    if measure == "focus":
+        probe = ActivationWatcher() if NSWorkspace is not None else FrontAppProbe()
+    try:
+        for _ in range(iters):
+            if measure == "focus":
+                activate_app(baseline_app, use_open)
+                if not wait_front(baseline_app, timeout_s, probe):
+                    print(f"{label}: failed to reach baseline app '{baseline_app}'", file=sys.stderr)
+                    continue
+            start_ns = time.perf_counter_ns()
+            run_cmd(run_args)
+            end_ns = time.perf_counter_ns()
+            if measure == "focus":
+                ok = wait_front(target_app, timeout_s, probe)
+                if not ok:
+                    print(f"{label}: timeout waiting for '{target_app}'", file=sys.stderr)
+                    continue
+            times.append(end_ns - start_ns)
+            time.sleep(0.05)
+    finally:
+        if probe is not None:
+            probe.close()
     return times
 
 
-def print_stats(label: str, values: List[float]) -> None:
+def print_stats(label: str, values: List[int]) -> None:
+    """Print mean/p50/p95 of nanosecond samples, converting to ms only for display.
+
+    Sorts `values` in place: one sort serves both percentiles and no copy of
+    the samples is made.
+    """
     if not values:
         print(f"{label}: no samples")
         return
-    values_sorted = sorted(values)
-    p50 = values_sorted[int(0.50 * (len(values_sorted) - 1))]
-    p95 = values_sorted[int(0.95 * (len(values_sorted) - 1))]
-    mean = statistics.mean(values_sorted)
-    print(f"{label}: n={len(values_sorted)} mean={mean:.1f}ms p50={p50:.1f}ms p95={p95:.1f}ms")
+    values.sort()
+    last = len(values) - 1
+    p50 = values[int(0.50 * last)]
+    p95 = values[int(0.95 * last)]
+    mean = statistics.mean(values)  # exact on ints; rounded once below
+    print(
+        f"{label}: n={len(values)} mean={mean / 1_000_000:.1f}ms "
+        f"p50={p50 / 1_000_000:.1f}ms p95={p95 / 1_000_000:.1f}ms"
+    )
 
 
 def main() -> int:
@@ -74,12 +284,13 @@ def main() -> int:
     parser.add_argument("--measure", choices=["focus", "dispatch"], default="focus", help="Measure focus-change or dispatch time")
     parser.add_argument("--km-macro", default="open: Comet", help="Keyboard Maestro macro name")
     parser.add_argument("--only", choices=["seq", "km", "both"], default="both", help="Which benchmark to run")
+    parser.add_argument("--use-open", action="store_true", help="Switch to the baseline app via /usr/bin/open instead of NSWorkspace")
     args = parser.parse_args()
 
     target_app = args.app
     baseline_app = args.baseline
 
-    results: List[tuple[str, List[float]]] = []
+    results: List[tuple[str, List[int]]] = []
 
     if args.only in ("seq", "both"):
         if args.seq_mode == "open-app":
@@ -88,13 +299,13 @@ def main() -> int:
             seq_args = [args.seq_bin, "open-app-toggle", target_app]
         else:
             seq_args = [args.seq_bin, "run", f"open: {target_app}"]
-        seq_times = bench_one("seq", seq_args, target_app, baseline_app, args.iters, args.timeout, args.measure)
+        seq_times = bench_one("seq", seq_args, target_app, baseline_app, args.iters, args.timeout, args.measure, args.use_open)
         results.append(("seq", seq_times))
 
     if args.only in ("km", "both"):
         km_script = f'tell application "Keyboard Maestro Engine" to do script "{args.km_macro}"'
         km_args = ["/usr/bin/osascript", "-e", km_script]
-        km_times = bench_one("km", km_args, target_app, baseline_app, args.iters, args.timeout, args.measure)
+        km_times = bench_one("km", km_args, target_app, baseline_app, args.iters, args.timeout, args.measure, args.use_open)
         results.append(("km", km_times))
 
     for label, vals in results:
@@ -6,6 +6,7 @@ from __future__ import annotations
 import argparse
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 
 VALID_MODES = ("native", "mirror", "file", "off")
@@ -46,10 +47,17 @@ def get_key(key: str) -> str:
     return value if value else "<empty>"
 
 
+def get_keys(keys: tuple[str, ...]) -> list[str]:
+    # `f env get` takes one key; run the lookups side by side so status costs
+    # one CLI round trip instead of len(keys).
+    with ThreadPoolExecutor(max_workers=len(keys)) as pool:
+        return list(pool.map(get_key, keys))
+
+
 def print_status() -> None:
     print("seq clickhouse mode env")
-    for key in STATUS_KEYS:
-        print(f"  {key}={get_key(key)}")
+    for key, value in zip(STATUS_KEYS, get_keys(STATUS_KEYS)):
+        print(f"  {key}={value}")
 
 
 def apply_mode(mode: str, host: str | None, port: int | None, database: str | None) -> None:
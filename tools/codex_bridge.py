@@ -14,6 +14,8 @@ Stdout: JSON with hookSpecificOutput.additionalContext (or empty on no-op).
 
 from __future__ import annotations
 
+import heapq
+import io
 import json
 import os
 import sys
@@ -22,12 +24,34 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; stdlib json is the fallback.
+    orjson = None
+
 DEFAULT_CODEX_DIR = Path("~/.codex/sessions").expanduser()
 DEFAULT_STATE_PATH = Path("~/.local/state/seq/codex_bridge_state.json").expanduser()
 HANDOFF_FILENAME = ".ai/handoff.md"
 MAX_CONTEXT_CHARS = 12_000
 MAX_EXCHANGES = 10
 MAX_ANSWER_CHARS = 800
+MAX_CACHED_FILES = 64
+TAIL_WINDOW_BYTES = 256 * 1024
+USER_PREFIX = "\n**User:** "
+ASSISTANT_PREFIX = "\n**Assistant:** "
+
+
+def _loads_line(line: bytes) -> Any:
+    """Decode one JSONL line from raw bytes; raises json.JSONDecodeError."""
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass  # blank or non-UTF-8 lines take the lenient path below
+    try:
+        return json.loads(line)
+    except UnicodeDecodeError:
+        return json.loads(line.decode("utf-8", errors="replace"))
 
 
 def _read_stdin_json() -> dict[str, Any]:
@@ -59,13 +83,37 @@ def _save_state(state_path: Path, state: dict[str, Any]) -> None:
     )
 
 
-def _discover_codex_sessions(codex_dir: Path) -> list[Path]:
-    """Find all Codex session JSONL files, sorted newest-first by mtime."""
+def _discover_codex_sessions(codex_dir: Path, limit: int | None = None) -> list[tuple[Path, os.stat_result]]:
+    """Find Codex session JSONL files with their stat, sorted newest-first by mtime.
+
+    Walks with os.scandir so each file costs one stat (file type comes from
+    the directory entry); callers reuse that stat instead of taking another.
+    With `limit`, only the newest `limit` files are kept via a bounded heap
+    instead of sorting everything.
+    """
     if not codex_dir.exists():
         return []
-    files = [p for p in codex_dir.rglob("*.jsonl") if p.is_file()]
-    files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-    return files
+    found: list[tuple[str, os.stat_result]] = []
+    stack = [str(codex_dir)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".jsonl") and entry.is_file():
+                        found.append((entry.path, entry.stat()))
+                except OSError:
+                    continue
+    if limit is not None:
+        newest = heapq.nlargest(limit, found, key=lambda item: item[1].st_mtime)
+    else:
+        newest = sorted(found, key=lambda item: item[1].st_mtime, reverse=True)
+    return [(Path(path), st) for path, st in newest]
 
 
 def _extract_text(obj: dict[str, Any]) -> str:
@@ -105,17 +153,27 @@ def _extract_codex_cwd(obj: dict[str, Any]) -> str:
     return ""
 
 
-def _parse_session(path: Path, project_dir: str | None, from_offset: int = 0) -> tuple[list[dict[str, str]], str, int]:
+def _is_session_header(obj: Any) -> bool:
+    """Session headers have no "type" field but carry "id" or "git"."""
+    return isinstance(obj, dict) and obj.get("type") is None and ("id" in obj or "git" in obj)
+
+
+def _parse_session(
+    path: Path, project_dir: str | None, from_offset: int = 0, st: os.stat_result | None = None
+) -> tuple[list[dict[str, str]], str, int]:
     """Parse a Codex session JSONL file.
 
     Returns (exchanges, session_cwd, end_offset).
     Each exchange is {"user": "...", "assistant": "..."}.
     If project_dir is set, skips sessions not matching that directory.
+    `st` is the stat from discovery, if the caller already has one.
     """
-    try:
-        size = path.stat().st_size
-    except FileNotFoundError:
-        return [], "", 0
+    if st is None:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return [], "", 0
+    size = st.st_size
 
     if size <= from_offset:
         return [], "", size
@@ -124,22 +182,35 @@ def _parse_session(path: Path, project_dir: str | None, from_offset: int = 0) ->
     session_cwd = ""
     pending_user: str | None = None
 
-    with path.open("rb") as fh:
-        if from_offset > 0:
-            fh.seek(from_offset)
+    try:
+        fh = path.open("rb")
+    except FileNotFoundError:  # removed since discovery
+        return [], "", 0
+    with fh:
+        # The header is the first line: reject other projects' sessions
+        # before parsing anything else, including on incremental reads.
+        first = fh.readline()
+        try:
+            header = _loads_line(first)
+        except json.JSONDecodeError:
+            header = None
+        if _is_session_header(header):
+            session_cwd = _extract_codex_cwd(header)
+            if project_dir and session_cwd and not session_cwd.startswith(project_dir):
+                return [], session_cwd, size
+            from_offset = max(from_offset, len(first))
+        fh.seek(from_offset)
         for line_bytes in fh:
-            line = line_bytes.decode("utf-8", errors="replace").strip()
-            if not line:
+            if line_bytes.isspace():
                 continue
             try:
-                obj = json.loads(line)
+                obj = _loads_line(line_bytes)
             except json.JSONDecodeError:
                 continue
             if not isinstance(obj, dict):
                 continue
 
-            # Session header (no "type" field, has "id" or "git")
-            if obj.get("type") is None and ("id" in obj or "git" in obj):
+            if _is_session_header(obj):
                 session_cwd = _extract_codex_cwd(obj)
                 if project_dir and session_cwd and not session_cwd.startswith(project_dir):
                     return [], session_cwd, size
@@ -166,12 +237,155 @@ def _parse_session(path: Path, project_dir: str | None, from_offset: int = 0) ->
     return exchanges, session_cwd, size
 
 
-def _find_matching_sessions(codex_dir: Path, project_dir: str | None) -> list[tuple[Path, list[dict[str, str]]]]:
-    """Find Codex sessions matching the current project, newest first."""
+def _scan_session(fh: Any, offset: int, summary: dict[str, Any], project_dir: str | None) -> int | None:
+    """Fold the lines from `offset` on into `summary`; return the new offset.
+
+    `summary` carries cwd, the last MAX_EXCHANGES exchanges, and any user
+    message still waiting for an answer. Returns None when a session header
+    does not match project_dir.
+    """
+    exchanges = summary["exchanges"]
+    pending_user = summary.get("pending_user")
+    fh.seek(offset)
+    for line_bytes in fh:
+        try:
+            obj = _loads_line(line_bytes)
+        except json.JSONDecodeError:
+            if not line_bytes.endswith(b"\n"):
+                break  # partial trailing line; re-read once the writer finishes it
+            offset += len(line_bytes)
+            continue
+        offset += len(line_bytes)
+        if not isinstance(obj, dict):
+            continue
+
+        if _is_session_header(obj):
+            summary["cwd"] = _extract_codex_cwd(obj)
+            if project_dir and summary["cwd"] and not summary["cwd"].startswith(project_dir):
+                return None
+            continue
+
+        if obj.get("type") != "message":
+            continue
+        role = obj.get("role")
+        text = _extract_text(obj)
+        if not text:
+            continue
+        if role == "user":
+            pending_user = text
+        elif role == "assistant" and pending_user:
+            answer = text
+            if len(answer) > MAX_ANSWER_CHARS:
+                answer = answer[:MAX_ANSWER_CHARS] + "..."
+            exchanges.append({"user": pending_user, "assistant": answer})
+            del exchanges[:-MAX_EXCHANGES]
+            pending_user = None
+    summary["pending_user"] = pending_user
+    return offset
+
+
+def _scan_session_tail(fh: Any, size: int, summary: dict[str, Any], project_dir: str | None) -> int | None:
+    """Cold-parse a session by reading the header line plus a tail window.
+
+    Exchanges only start after a user message, so any exchange inside a
+    window starting on a line boundary is the same as in a full parse. Once
+    the window holds MAX_EXCHANGES of them, nothing before it can change the
+    result. Otherwise the window grows 4x until it reaches the header.
+    """
+    first = fh.readline()
+    try:
+        header = _loads_line(first)
+    except json.JSONDecodeError:
+        header = None
+    if not _is_session_header(header):
+        return _scan_session(fh, 0, summary, project_dir)
+    body_start = len(first)
+    summary["cwd"] = _extract_codex_cwd(header)
+    if project_dir and summary["cwd"] and not summary["cwd"].startswith(project_dir):
+        return None
+
+    window = TAIL_WINDOW_BYTES
+    while size - window > body_start:
+        fh.seek(size - window - 1)
+        line_start = size - window - 1 + len(fh.readline())  # align to the next line boundary
+        trial = {"cwd": summary["cwd"], "exchanges": [], "pending_user": None}
+        end = _scan_session(fh, line_start, trial, project_dir)
+        if end is None or len(trial["exchanges"]) >= MAX_EXCHANGES:
+            summary.update(trial)
+            return end
+        window *= 4
+    return _scan_session(fh, body_start, summary, project_dir)
+
+
+def _refresh_session_entry(
+    path: Path, entry: dict[str, Any] | None, project_dir: str | None, st: os.stat_result | None = None
+) -> dict[str, Any] | None:
+    """Bring a cached session summary up to date, parsing only bytes past its offset.
+
+    Entries hold the session cwd, the last MAX_EXCHANGES exchanges, any user
+    message still waiting for an answer, and the offset just past the last
+    complete line. Unchanged files (same mtime and size) are returned as-is;
+    files without a usable entry are cold-parsed from the tail. A header that
+    does not match project_dir leaves offset=None, so a later call for a
+    matching project starts from scratch.
+    """
+    if st is None:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+    fresh = entry and entry.get("mtime") == st.st_mtime and entry.get("size") == st.st_size
+    if fresh and entry.get("offset") is not None:
+        return entry
+
+    offset = entry.get("offset") if entry else None
+    resume = bool(entry) and isinstance(offset, int) and 0 <= offset <= st.st_size
+    if resume:
+        summary = dict(entry)
+        summary["exchanges"] = list(entry.get("exchanges") or [])
+    else:
+        summary = {"cwd": "", "exchanges": [], "pending_user": None}
+
+    try:
+        fh = path.open("rb")
+    except FileNotFoundError:  # removed since discovery
+        return None
+    with fh:
+        if resume:
+            end = _scan_session(fh, offset, summary, project_dir)
+        else:
+            end = _scan_session_tail(fh, st.st_size, summary, project_dir)
+
+    if end is None:
+        return {"cwd": summary["cwd"], "offset": None, "mtime": st.st_mtime, "size": st.st_size}
+    summary.update(offset=end, mtime=st.st_mtime, size=st.st_size)
+    return summary
+
+
+def _find_matching_sessions(
+    codex_dir: Path, project_dir: str | None, cache: dict[str, Any] | None = None
+) -> list[tuple[Path, list[dict[str, str]]]]:
+    """Find Codex sessions matching the current project, newest first.
+
+    `cache` maps session paths to `_refresh_session_entry` summaries and is
+    updated in place, so repeat calls only parse newly appended bytes.
+    """
+    if cache is None:
+        cache = {}
     results: list[tuple[Path, list[dict[str, str]]]] = []
-    for path in _discover_codex_sessions(codex_dir):
-        exchanges, cwd, _ = _parse_session(path, project_dir)
-        if exchanges:
+    for path, st in _discover_codex_sessions(codex_dir):
+        key = str(path)
+        entry = cache.get(key)
+        cwd = entry.get("cwd") if entry else ""
+        if project_dir and cwd and not cwd.startswith(project_dir):
+            continue  # header never changes; no need to look at the file
+        entry = _refresh_session_entry(path, entry, project_dir, st)
+        if entry is None:
+            cache.pop(key, None)
+            continue
+        cache[key] = entry
+        exchanges = entry.get("exchanges") or []
+        if entry.get("offset") is not None and exchanges:
             results.append((path, exchanges))
         if len(results) >= 3:  # At most 3 recent sessions
             break
@@ -182,26 +396,47 @@ def _format_exchanges(exchanges: list[dict[str, str]], header: str) -> str:
     """Format exchanges as readable context."""
     if not exchanges:
         return ""
-    lines = [header]
+    buf = io.StringIO()
+    buf.write(header)
     for i, ex in enumerate(exchanges[-MAX_EXCHANGES:], 1):
-        lines.append(f"\n### Exchange {i}")
-        lines.append(f"**User:** {ex['user']}")
-        lines.append(f"**Assistant:** {ex['assistant']}")
-    return "\n".join(lines)
+        buf.write(f"\n\n### Exchange {i}")
+        buf.write(USER_PREFIX)
+        buf.write(ex["user"])
+        buf.write(ASSISTANT_PREFIX)
+        buf.write(ex["assistant"])
+    return buf.getvalue()
 
 
-def _read_handoff(project_dir: str) -> str:
-    """Read .ai/handoff.md if it exists."""
+def _read_handoff(project_dir: str, cache: dict[str, Any] | None = None) -> str:
+    """Read .ai/handoff.md if it exists.
+
+    `cache` holds the last read file's path, mtime, size and content and is
+    updated in place; an unchanged file is served from it without a read.
+    """
     handoff_path = Path(project_dir) / HANDOFF_FILENAME
-    if not handoff_path.exists():
-        return ""
     try:
-        content = handoff_path.read_text(encoding="utf-8").strip()
-        if content:
-            return f"\n---\n## Previous Handoff Context\n{content}"
-        return ""
-    except Exception:
+        st = handoff_path.stat()
+    except OSError:
         return ""
+    key = str(handoff_path)
+    if (
+        cache is not None
+        and cache.get("path") == key
+        and cache.get("mtime") == st.st_mtime
+        and cache.get("size") == st.st_size
+    ):
+        content = cache.get("content") or ""
+    else:
+        try:
+            content = handoff_path.read_text(encoding="utf-8").strip()
+        except Exception:
+            return ""
+        if cache is not None:
+            cache.clear()
+            cache.update(path=key, mtime=st.st_mtime, size=st.st_size, content=content)
+    if content:
+        return f"\n---\n## Previous Handoff Context\n{content}"
+    return ""
 
 
 def _output_context(context: str, hook_event: str) -> None:
@@ -224,11 +459,29 @@ def mode_session_start(hook_input: dict[str, Any]) -> None:
     """SessionStart: inject recent Codex history + handoff file."""
     project_dir = hook_input.get("cwd") or os.environ.get("CLAUDE_PROJECT_DIR", "")
     codex_dir = Path(os.environ.get("SEQ_CODEX_DIR", str(DEFAULT_CODEX_DIR)))
+    state_path = Path(os.environ.get("SEQ_CODEX_BRIDGE_STATE", str(DEFAULT_STATE_PATH)))
 
     parts: list[str] = []
 
-    # 1. Read Codex session history
-    sessions = _find_matching_sessions(codex_dir, project_dir or None)
+    # 1. Read Codex session history (incrementally, via the cached per-file summaries)
+    state = _load_state(state_path)
+    cached_files = state.get("files")
+    if not isinstance(cached_files, dict):
+        cached_files = {}
+    sessions = _find_matching_sessions(codex_dir, project_dir or None, cached_files)
+    newest = sorted(cached_files.items(), key=lambda kv: kv[1].get("mtime") or 0, reverse=True)
+    state["files"] = dict(newest[:MAX_CACHED_FILES])
+
+    # 2. Read handoff file (served from state while its mtime and size hold)
+    handoff = ""
+    if project_dir:
+        handoff_cache = state.get("handoff")
+        if not isinstance(handoff_cache, dict):
+            handoff_cache = {}
+        handoff = _read_handoff(project_dir, handoff_cache)
+        state["handoff"] = handoff_cache
+    _save_state(state_path, state)
+
     if sessions:
         for path, exchanges in sessions:
             session_name = path.stem
@@ -237,11 +490,8 @@ def mode_session_start(hook_input: dict[str, Any]) -> None:
             if formatted:
                 parts.append(formatted)
 
-    # 2. Read handoff file
-    if project_dir:
-        handoff = _read_handoff(project_dir)
-        if handoff:
-            parts.append(handoff)
+    if handoff:
+        parts.append(handoff)
 
     if parts:
         context = "# Context from Codex\n" + "\n\n".join(parts)
@@ -257,14 +507,14 @@ def mode_prompt_submit(hook_input: dict[str, Any]) -> None:
     state = _load_state(state_path)
     offsets: dict[str, int] = state.get("offsets", {})
 
-    sessions = _discover_codex_sessions(codex_dir)
+    sessions = _discover_codex_sessions(codex_dir, limit=5)  # Only check recent files
     new_exchanges: list[dict[str, str]] = []
 
-    for path in sessions[:5]:  # Only check recent files
+    for path, st in sessions:
         key = str(path)
         prev_offset = offsets.get(key, 0)
 
-        exchanges, cwd, end_offset = _parse_session(path, project_dir or None, from_offset=prev_offset)
+        exchanges, cwd, end_offset = _parse_session(path, project_dir or None, from_offset=prev_offset, st=st)
         offsets[key] = end_offset
 
         if exchanges:
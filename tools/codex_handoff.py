@@ -14,19 +14,40 @@ Stdin (save mode): JSON from Claude Code PreCompact hook.
 
 from __future__ import annotations
 
+import hashlib
+import io
 import json
 import os
+import re
 import subprocess
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 HANDOFF_FILENAME = ".ai/handoff.md"
+HANDOFF_STATE_FILENAME = ".ai/.handoff.state.json"
 MAX_PROMPT_CHARS = 4_000
 MAX_PLAN_CHARS = 8_000
 MAX_DECISION_CHARS = 4_000
 MAX_DIFF_CHARS = 2_000
+MAX_HANDOFF_DECISIONS = 10
+
+PLAN_MARKERS = (
+    "## plan", "# plan", "implementation plan",
+    "step 1:", "## approach", "## architecture",
+    "## part 1:", "## files to create", "## context",
+)
+DECISION_MARKERS = (
+    "decided to", "choosing", "trade-off",
+    "instead of", "approach:", "going with",
+)
+# One pass per message for all markers, without lowercasing a copy first.
+_PLAN_RE = re.compile("|".join(map(re.escape, PLAN_MARKERS)), re.IGNORECASE | re.ASCII)
+_DECISION_RE = re.compile("|".join(map(re.escape, DECISION_MARKERS)), re.IGNORECASE | re.ASCII)
+# The markers are plain ASCII that JSON never escapes, so any record that can
+# match them contains one of them in its (ASCII-lowercased) raw bytes too.
+_MARKER_BYTES = tuple(m.encode() for m in PLAN_MARKERS + DECISION_MARKERS)
 
 
 def _read_stdin_json() -> dict[str, Any]:
@@ -61,6 +82,57 @@ def _extract_claude_text(message: Any) -> str:
     return "\n".join(parts)
 
 
+def _decode_record(line: bytes) -> dict[str, Any] | None:
+    try:
+        obj = json.loads(line)
+    except ValueError:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _marker_line_starts(data: bytes, pos: int) -> list[int]:
+    """Return the sorted start offsets of lines at or after `pos` holding a marker."""
+    lowered = data.lower()  # bytes.lower() only folds ASCII, like the markers
+    starts: set[int] = set()
+    for marker in _MARKER_BYTES:
+        hit = lowered.find(marker, pos)
+        while hit != -1:
+            starts.add(lowered.rfind(b"\n", pos, hit) + 1 or pos)
+            line_end = lowered.find(b"\n", hit)
+            if line_end == -1:
+                break
+            hit = lowered.find(marker, line_end)
+    return sorted(starts)
+
+
+def _transcript_records(data: bytes) -> Iterator[dict[str, Any]]:
+    """Yield the transcript records that _parse_transcript can act on.
+
+    Records are decoded in order up to the first user message with text (the
+    original prompt). After that only marker matches matter, so a scan of the
+    raw bytes picks the lines to decode and the rest are never parsed.
+    """
+    pos = 0
+    size = len(data)
+    while pos < size:
+        end = data.find(b"\n", pos)
+        if end == -1:
+            end = size
+        obj = _decode_record(data[pos:end])
+        pos = end + 1
+        if obj is None:
+            continue
+        yield obj
+        if obj.get("type") == "user" and _extract_claude_text(obj.get("message")):
+            break
+
+    for start in _marker_line_starts(data, pos):
+        end = data.find(b"\n", start)
+        obj = _decode_record(data[start:end if end != -1 else size])
+        if obj is not None:
+            yield obj
+
+
 def _parse_transcript(transcript_path: str) -> dict[str, Any]:
     """Parse a Claude Code transcript JSONL to extract key context.
 
@@ -77,73 +149,47 @@ def _parse_transcript(transcript_path: str) -> dict[str, Any]:
     if not path.exists():
         return result
 
-    PLAN_MARKERS = [
-        "## plan", "# plan", "implementation plan",
-        "step 1:", "## approach", "## architecture",
-        "## part 1:", "## files to create", "## context",
-    ]
-    DECISION_MARKERS = [
-        "decided to", "choosing", "trade-off",
-        "instead of", "approach:", "going with",
-    ]
-
     first_user = True
     plan_found = False
 
     try:
-        with path.open("r", encoding="utf-8") as fh:
-            for line in fh:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError:
+        for obj in _transcript_records(path.read_bytes()):
+            record_type = obj.get("type")
+
+            if record_type == "user":
+                text = _extract_claude_text(obj.get("message"))
+                if not text:
                     continue
-                if not isinstance(obj, dict):
+
+                # Capture original user prompt (first user message)
+                if first_user:
+                    result["original_prompt"] = text[:MAX_PROMPT_CHARS]
+                    first_user = False
+
+                # Plans are often pasted in user messages
+                # (e.g. "Implement the following plan: ...")
+                if not plan_found and _PLAN_RE.search(text):
+                    result["plan"] = text[:MAX_PLAN_CHARS]
+                    plan_found = True
+                continue
+
+            if record_type == "assistant":
+                text = _extract_claude_text(obj.get("message"))
+                if not text:
                     continue
 
-                record_type = obj.get("type")
-
-                if record_type == "user":
-                    text = _extract_claude_text(obj.get("message"))
-                    if not text:
-                        continue
-
-                    # Capture original user prompt (first user message)
-                    if first_user:
-                        result["original_prompt"] = text[:MAX_PROMPT_CHARS]
-                        first_user = False
-
-                    # Plans are often pasted in user messages
-                    # (e.g. "Implement the following plan: ...")
-                    if not plan_found:
-                        lower = text.lower()
-                        if any(marker in lower for marker in PLAN_MARKERS):
-                            result["plan"] = text[:MAX_PLAN_CHARS]
-                            plan_found = True
+                # Detect plan-like content in assistant messages too
+                if not plan_found and _PLAN_RE.search(text):
+                    result["plan"] = text[:MAX_PLAN_CHARS]
+                    plan_found = True
                     continue
 
-                if record_type == "assistant":
-                    text = _extract_claude_text(obj.get("message"))
-                    if not text:
-                        continue
-
-                    # Detect plan-like content in assistant messages too
-                    if not plan_found:
-                        lower = text.lower()
-                        if any(marker in lower for marker in PLAN_MARKERS):
-                            result["plan"] = text[:MAX_PLAN_CHARS]
-                            plan_found = True
-                            continue
-
-                    # Detect decision-like content
-                    lower = text.lower()
-                    if any(marker in lower for marker in DECISION_MARKERS):
-                        summary = text[:300]
-                        if len(text) > 300:
-                            summary += "..."
-                        result["decisions"].append(summary)
+                # Detect decision-like content
+                if _DECISION_RE.search(text):
+                    summary = text[:300]
+                    if len(text) > 300:
+                        summary += "..."
+                    result["decisions"].append(summary)
 
     except Exception:
         pass
@@ -151,33 +197,92 @@ def _parse_transcript(transcript_path: str) -> dict[str, Any]:
     return result
 
 
+def _git_output(proc: subprocess.Popen[str], timeout: float) -> str:
+    """Wait for a git child and return its stripped stdout ("" on failure)."""
+    try:
+        out, _ = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        return ""
+    return out.strip() if proc.returncode == 0 else ""
+
+
+def _load_handoff_state(state_path: Path) -> dict[str, Any]:
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _save_handoff_state(state_path: Path, state: dict[str, Any]) -> None:
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(state, ensure_ascii=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, state_path)
+
+
+def _parse_transcript_cached(transcript_path: str, state: dict[str, Any]) -> dict[str, Any]:
+    """Return _parse_transcript(transcript_path), reusing the sidecar's copy.
+
+    The cached parse in `state` is used while the transcript's path, mtime
+    and size all match; otherwise the transcript is parsed and `state` is
+    updated in place.
+    """
+    try:
+        st = os.stat(transcript_path)
+    except OSError:
+        return _parse_transcript(transcript_path)
+    parsed = state.get("parsed")
+    if (
+        isinstance(parsed, dict)
+        and state.get("transcript_path") == transcript_path
+        and state.get("transcript_mtime") == st.st_mtime
+        and state.get("transcript_size") == st.st_size
+    ):
+        return dict(parsed)
+    parsed = _parse_transcript(transcript_path)
+    parsed["decisions"] = parsed["decisions"][:MAX_HANDOFF_DECISIONS]  # the rest is never written
+    state.update(
+        transcript_path=transcript_path,
+        transcript_mtime=st.st_mtime,
+        transcript_size=st.st_size,
+        parsed=parsed,
+    )
+    return dict(parsed)
+
+
 def _get_git_diff_summary(project_dir: str) -> str:
-    """Get a brief git diff stat (tracked changes + new untracked files)."""
+    """Get a brief git diff stat (tracked changes + new untracked files).
+
+    Both git commands are independent, so they run side by side.
+    """
     parts: list[str] = []
     try:
         # Tracked changes (staged + unstaged) vs HEAD
-        proc = subprocess.run(
+        diff_proc = subprocess.Popen(
             ["git", "diff", "--stat", "HEAD"],
             cwd=project_dir,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
             text=True,
-            timeout=5,
         )
-        if proc.returncode == 0 and proc.stdout.strip():
-            parts.append(proc.stdout.strip())
-
         # New untracked files
-        proc2 = subprocess.run(
+        untracked_proc = subprocess.Popen(
             ["git", "ls-files", "--others", "--exclude-standard"],
             cwd=project_dir,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
             text=True,
-            timeout=5,
         )
-        if proc2.returncode == 0 and proc2.stdout.strip():
-            new_files = proc2.stdout.strip().splitlines()
-            if new_files:
-                parts.append("New files:\n" + "\n".join(f"  {f}" for f in new_files[:20]))
+        stat = _git_output(diff_proc, timeout=5)
+        if stat:
+            parts.append(stat)
+        untracked = _git_output(untracked_proc, timeout=5)
+        if untracked:
+            new_files = untracked.splitlines()
+            parts.append("New files:\n" + "\n".join(f"  {f}" for f in new_files[:20]))
     except Exception:
         pass
 
@@ -187,49 +292,66 @@ def _get_git_diff_summary(project_dir: str) -> str:
     return diff
 
 
-def _write_handoff(project_dir: str, context: dict[str, Any]) -> str:
-    """Write .ai/handoff.md and return its path."""
+def _write_handoff(project_dir: str, context: dict[str, Any], state: dict[str, Any] | None = None) -> str | None:
+    """Write .ai/handoff.md atomically and return its path.
+
+    With `state` (the handoff sidecar), a digest of everything below the
+    Updated line is kept; if it matches and the file on disk is the one last
+    written, the write is skipped and None is returned.
+    """
     handoff_path = Path(project_dir) / HANDOFF_FILENAME
     handoff_path.parent.mkdir(parents=True, exist_ok=True)
 
-    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    lines: list[str] = []
-    lines.append("# Handoff: Claude Code → Codex")
-    lines.append(f"Updated: {now}")
+    buf = io.StringIO()
 
     # Original prompt
     prompt = context.get("original_prompt", "")
     if prompt:
-        lines.append("")
-        lines.append("## Original Prompt")
-        lines.append(prompt)
+        buf.write("\n## Original Prompt\n")
+        buf.write(prompt)
+        buf.write("\n")
 
     # Plan
     plan = context.get("plan", "")
     if plan:
-        lines.append("")
-        lines.append("## Plan")
-        lines.append(plan)
+        buf.write("\n## Plan\n")
+        buf.write(plan)
+        buf.write("\n")
 
     # Key decisions
     decisions = context.get("decisions", [])
     if decisions:
-        lines.append("")
-        lines.append("## Key Decisions")
-        for d in decisions[:10]:
-            lines.append(f"- {d}")
+        buf.write("\n## Key Decisions\n")
+        for d in decisions[:MAX_HANDOFF_DECISIONS]:
+            buf.write("- ")
+            buf.write(d)
+            buf.write("\n")
 
     # Changes made so far
     diff = context.get("diff_summary", "")
     if diff:
-        lines.append("")
-        lines.append("## Changes Made So Far")
-        lines.append("```")
-        lines.append(diff)
-        lines.append("```")
-
-    content = "\n".join(lines) + "\n"
-    handoff_path.write_text(content, encoding="utf-8")
+        buf.write("\n## Changes Made So Far\n```\n")
+        buf.write(diff)
+        buf.write("\n```\n")
+
+    body = buf.getvalue()
+    digest = hashlib.blake2b(body.encode("utf-8"), digest_size=8).hexdigest()
+    if state is not None and state.get("handoff_digest") == digest:
+        try:
+            st = handoff_path.stat()
+        except OSError:
+            st = None
+        if st is not None and state.get("handoff_stamp") == [st.st_mtime, st.st_size]:
+            return None
+
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    content = f"# Handoff: Claude Code → Codex\nUpdated: {now}\n{body}"
+    tmp_path = handoff_path.with_name(handoff_path.name + ".tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, handoff_path)
+    if state is not None:
+        st = handoff_path.stat()
+        state.update(handoff_digest=digest, handoff_stamp=[st.st_mtime, st.st_size])
     return str(handoff_path)
 
 
@@ -241,7 +363,10 @@ def mode_save(hook_input: dict[str, Any]) -> None:
     if not project_dir:
         return
 
-    context = _parse_transcript(transcript_path) if transcript_path else {
+    state_path = Path(project_dir) / HANDOFF_STATE_FILENAME
+    state = _load_handoff_state(state_path)
+    saved_state = dict(state)
+    context = _parse_transcript_cached(transcript_path, state) if transcript_path else {
         "original_prompt": "",
         "plan": "",
         "decisions": [],
@@ -259,8 +384,13 @@ def mode_save(hook_input: dict[str, Any]) -> None:
     ])
 
     if has_content:
-        handoff_path = _write_handoff(project_dir, context)
-        print(f"[codex-handoff] saved: {handoff_path}", file=sys.stderr)
+        handoff_path = _write_handoff(project_dir, context, state)
+        if state != saved_state:
+            _save_handoff_state(state_path, state)
+        if handoff_path:
+            print(f"[codex-handoff] saved: {handoff_path}", file=sys.stderr)
+        else:
+            print("[codex-handoff] unchanged, skipped write", file=sys.stderr)
 
 
 def mode_clear(project_dir: str | None = None) -> None:
@@ -268,6 +398,7 @@ def mode_clear(project_dir: str | None = None) -> None:
     if not project_dir:
         project_dir = os.getcwd()
     handoff_path = Path(project_dir) / HANDOFF_FILENAME
+    (Path(project_dir) / HANDOFF_STATE_FILENAME).unlink(missing_ok=True)
     if handoff_path.exists():
         handoff_path.unlink()
         print(f"[codex-handoff] cleared: {handoff_path}", file=sys.stderr)
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import functools
+import os
 import re
 from pathlib import Path
-from typing import Iterable, Tuple, Optional
+from typing import Callable, Iterable, Optional, TextIO, Tuple
 
 
 CONFIG_PATH = Path("/Users/nikiv/config/i/kar/config.ts")
@@ -16,51 +18,206 @@ SWITCH_WINDOW_OR_APP = (
     "switch between windows of same app (or switch to another app if no more than 1 window)"
 )
 
-def find_call_strings(text: str, func_name: str) -> list[str]:
-    out: list[str] = []
-    i = 0
+CALL_FUNCS = ("km", "seq", "seqSocket")
+
+_CALL_RE = re.compile(r"(km|seqSocket|seq)\(")
+_WS_RE = re.compile(r"[ \t\r\n]*")
+# String literal bodies (after the opening quote) up to the closing quote.
+_DQ_BODY_RE = re.compile(r'((?:\\.|[^"\\])*)"', re.DOTALL)
+_SQ_BODY_RE = re.compile(r"((?:\\.|[^'\\])*)'", re.DOTALL)
+_UNESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+# Inside a seq() step list only brackets matter; string literals are skipped whole.
+_BODY_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"?|\'(?:\\.|[^\'\\])*\'?|[\[\]]', re.DOTALL)
+_PAREN_SUFFIX_RE = re.compile(r"\s+\([^)]*\)$")
+_DOMAIN_RE = re.compile(r"[A-Za-z0-9-]+\.[A-Za-z]{2,}")
+_NEW_TAB_RE = re.compile(r"^open\s+(.+?)\s+new\s+tab$", re.IGNORECASE)
+# Keep this intentionally narrow: only the primitives we generate in config.ts.
+# Note: do not over-escape parens in raw regex strings.
+_STEP_ITEM_RE = re.compile(
+    r'openApp\(\s*(?P<q1>["\'])(?P<app>.*?)(?P=q1)\s*\)'
+    r'|keystroke\(\s*(?P<q2>["\'])(?P<k>.*?)(?P=q2)\s*\)',
+    re.DOTALL,
+)
+
+_HEADER = (
+    "# Generated from /Users/nikiv/config/i/kar/config.ts\n"
+    "# Fields: name, action, arg, app (optional)\n"
+    "# Actions: open_app, open_app_toggle, open_url, session_save, paste_text, switch_window_or_app, keystroke, select_menu_item, click, double_click, right_click, scroll, drag, mouse_move, screenshot, sequence, todo\n"
+    "\n"
+)
+# Fixed YAML bodies for the generated sequence macros (everything after `- name:`).
+_SEQUENCE_HEAD = '  action: sequence\n  arg: ""\n  steps:\n'
+_LINEAR_TEAM_TMPL = (
+    _SEQUENCE_HEAD
+    + '    - action: open_app\n      arg: "Linear"\n'
+    + '    - action: keystroke\n      arg: "cmd+1"\n'
+    + '    - action: keystroke\n      arg: "cmd+k"\n'
+    + '    - action: paste_text\n      arg: "team {arg}"\n'
+)
+_LINEAR_NEW_TASK = (
+    _SEQUENCE_HEAD
+    + '    - action: open_app\n      arg: "Linear"\n'
+    + '    - action: keystroke\n      arg: "cmd+1"\n'
+    + '    - action: keystroke\n      arg: "cmd+n"\n'
+)
+_ENTER_TMPL = (
+    _SEQUENCE_HEAD
+    + '    - action: paste_text\n      arg: "{arg}"\n'
+    + '    - action: keystroke\n      arg: "return"\n'
+)
+_SELECTION_TO_CLAUDE = (
+    _SEQUENCE_HEAD
+    + '    - action: keystroke\n      arg: "cmd+c"\n'
+    + '    - action: open_app\n      arg: "Claude"\n'
+    + '    - action: keystroke\n      arg: "cmd+v"\n'
+    + '    - action: keystroke\n      arg: "return"\n'
+)
+_SELECTION_TO_LM_STUDIO = (
+    _SEQUENCE_HEAD
+    + '    - action: keystroke\n      arg: "cmd+c"\n'
+    + '    - action: open_app\n      arg: "LM Studio"\n'
+    + '    - action: keystroke\n      arg: "cmd+v"\n'
+)
+
+# classify() sequence args -> YAML body: exact args, then "<kind>:<value>" args.
+_SEQUENCE_BLOCKS = {
+    "linear_new_task": _LINEAR_NEW_TASK,
+    # Best-effort port of the current KM macro (cmd+1 then cmd+n).
+    "linear_focus_initiative": _LINEAR_NEW_TASK,
+    "selection_to_claude": _SELECTION_TO_CLAUDE,
+    "selection_to_lm_studio": _SELECTION_TO_LM_STUDIO,
+}
+_SEQUENCE_TEMPLATES = {
+    "linear_team": _LINEAR_TEAM_TMPL,
+    "enter": _ENTER_TMPL,
+}
+
+
+def _sequence_block(arg: str) -> Optional[str]:
+    block = _SEQUENCE_BLOCKS.get(arg)
+    if block is not None:
+        return block
+    kind, sep, value = arg.partition(":")
+    template = _SEQUENCE_TEMPLATES.get(kind) if sep else None
+    if template is None:
+        return None
+    return template.format(arg=escape_yaml(value))
+
+
+def _read_string_body(text: str, j: int, quote: str) -> tuple[Optional[str], int]:
+    """Read a string literal whose opening quote ends just before `j`.
+
+    Returns (unescaped value, position after the closing quote), or
+    (None, len(text)) if the literal never closes.
+    """
+    m = (_DQ_BODY_RE if quote == '"' else _SQ_BODY_RE).match(text, j)
+    if m is None:
+        return None, len(text)
+    raw = m.group(1)
+    if "\\" in raw:
+        raw = _UNESCAPE_RE.sub(r"\1", raw)
+    return raw, m.end()
+
+
+def _read_call_string(text: str, pos: int, needle_len: int) -> tuple[Optional[str], int]:
+    """Read the string literal opening a call at `pos`.
+
+    Returns (value or None, position to resume scanning from); the resume
+    position is past the end of `text` when there is nothing left to find.
+    """
     n = len(text)
-    needle = f"{func_name}("
-    while True:
-        pos = text.find(needle, i)
-        if pos == -1:
-            break
-        line_start = text.rfind("\n", 0, pos) + 1
-        line_prefix = text[line_start:pos]
-        if "//" in line_prefix:
-            i = pos + 3
-            continue
-        j = pos + len(needle)
-        while j < n and text[j] in " \t\r\n":
-            j += 1
-        if j >= n:
-            break
-        quote = text[j]
-        if quote not in ("\"", "'"):
-            i = j + 1
-            continue
-        j += 1
-        buf = []
-        while j < n:
-            c = text[j]
-            if c == "\\":
-                if j + 1 < n:
-                    buf.append(text[j + 1])
-                    j += 2
-                    continue
-                break
-            if c == quote:
-                out.append("".join(buf))
-                j += 1
+    # rfind stops at the previous newline, so this only walks the current line.
+    line_start = text.rfind("\n", 0, pos) + 1
+    if text.find("//", line_start, pos) != -1:
+        return None, pos + 3
+    j = _WS_RE.match(text, pos + needle_len).end()
+    if j >= n:
+        return None, n + 1
+    quote = text[j]
+    if quote not in ("\"", "'"):
+        return None, j + 1
+    return _read_string_body(text, j + 1, quote)
+
+
+def _read_seq_steps(text: str, pos: int) -> tuple[Optional[str], list[tuple[str, str]], int]:
+    """
+    Extremely narrow parser for a seq() call at `pos`:
+
+      seq("Name", [openApp("Arc"), keystroke("ctrl+1"), keystroke("cmd+6")])
+
+    Returns (name, [("open_app","Arc"), ("keystroke","ctrl+1"), ...], resume
+    position); name is None when the call is not of that shape.
+    """
+    n = len(text)
+    j = _WS_RE.match(text, pos + len("seq(")).end()
+    if j >= n:
+        return None, [], n + 1
+    quote = text[j]
+    if quote not in ("\"", "'"):
+        return None, [], j + 1
+    name, j = _read_string_body(text, j + 1, quote)
+    if name is None:
+        return None, [], j
+
+    j = _WS_RE.match(text, j).end()
+    if j >= n or text[j] != ",":
+        return None, [], j
+    j = _WS_RE.match(text, j + 1).end()
+    if j >= n or text[j] != "[":
+        return None, [], j
+
+    # Extract body up to matching ']', skipping over string literals.
+    body_start = j + 1
+    depth = 1
+    for tok in _BODY_TOKEN_RE.finditer(text, body_start):
+        c = tok.group()
+        if c == "[":
+            depth += 1
+        elif c == "]":
+            depth -= 1
+            if depth == 0:
+                j = tok.start()
                 break
-            buf.append(c)
-            j += 1
-        i = j
-    return out
+    if depth != 0:
+        return None, [], pos + len("seq(")
+    body = text[body_start:j]
+
+    ordered: list[tuple[str, str]] = []
+    for im in _STEP_ITEM_RE.finditer(body):
+        if im.group("app") is not None:
+            ordered.append(("open_app", im.group("app")))
+        else:
+            ordered.append(("keystroke", im.group("k")))
+    return name, ordered, j + 1
+
+
+def scan_config(text: str) -> tuple[dict[str, list[str]], dict[str, list[tuple[str, str]]]]:
+    """Collect macro names and seq step macros from config.ts in one pass.
+
+    Returns ({"km": [...], "seq": [...], "seqSocket": [...]}, seq step macros).
+    Every call site is located by a single regex scan; each kind keeps its own
+    resume position so the results match scanning for each needle separately.
+    """
+    calls: dict[str, list[str]] = {func: [] for func in CALL_FUNCS}
+    steps: dict[str, list[tuple[str, str]]] = {}
+    resume = dict.fromkeys(CALL_FUNCS, 0)
+    steps_resume = 0
+    for m in _CALL_RE.finditer(text):
+        func = m.group(1)
+        pos = m.start()
+        if pos >= resume[func]:
+            value, resume[func] = _read_call_string(text, pos, m.end() - pos)
+            if value is not None:
+                calls[func].append(value)
+        if func == "seq" and pos >= steps_resume:
+            name, ordered, steps_resume = _read_seq_steps(text, pos)
+            if name is not None and ordered:
+                steps[name] = ordered
+    return calls, steps
 
 
 def strip_paren_suffix(value: str) -> str:
-    return re.sub(r"\s+\([^)]*\)$", "", value).strip()
+    return _PAREN_SUFFIX_RE.sub("", value).strip()
 
 
 def guess_url(value: str) -> Optional[str]:
@@ -71,137 +228,36 @@ def guess_url(value: str) -> Optional[str]:
         return "http://" + raw
     if " " in raw:
         return None
-    if re.search(r"[A-Za-z0-9-]+\.[A-Za-z]{2,}", raw):
+    if _DOMAIN_RE.search(raw):
         return "https://" + raw
     return None
 
 
 def escape_yaml(value: str) -> str:
+    # Most names need no escaping; two `in` scans beat building new strings.
+    # (str.translate with multi-char replacements is ~15x slower than this.)
+    if "\\" not in value and "\"" not in value:
+        return value
     return value.replace("\\", "\\\\").replace("\"", "\\\"")
 
 def load_tsv_map(path: Path) -> dict[str, str]:
     out: dict[str, str] = {}
     if not path.exists():
         return out
-    for raw in path.read_text().splitlines():
-        line = raw.strip()
-        if not line or line.startswith("#"):
-            continue
-        if "\t" not in line:
-            continue
-        k, v = line.split("\t", 1)
-        k = k.strip()
-        v = v.strip()
-        if k and v:
-            out[k] = v
-    return out
-
-def find_seq_step_macros(text: str) -> dict[str, list[tuple[str, str]]]:
-    """
-    Extremely narrow parser for:
-
-      seq("Name", [openApp("Arc"), keystroke("ctrl+1"), keystroke("cmd+6")])
-
-    Returns: { "Name": [("open_app","Arc"), ("keystroke","ctrl+1"), ...] }
-    """
-    out: dict[str, list[tuple[str, str]]] = {}
-
-    # Scan for seq("<name>", [ ... ]) without backtracking across unrelated seq(...) calls.
-    i = 0
-    needle = "seq("
-    n = len(text)
-    while True:
-        pos = text.find(needle, i)
-        if pos == -1:
-            break
-        j = pos + len(needle)
-        while j < n and text[j] in " \t\r\n":
-            j += 1
-        if j >= n:
-            break
-        quote = text[j]
-        if quote not in ("\"", "'"):
-            i = j + 1
-            continue
-        j += 1
-        name_buf = []
-        while j < n:
-            c = text[j]
-            if c == "\\" and j + 1 < n:
-                name_buf.append(text[j + 1])
-                j += 2
+    with path.open() as fh:
+        for raw in fh:
+            line = raw.strip()
+            if not line or line[0] == "#":
                 continue
-            if c == quote:
-                j += 1
-                break
-            name_buf.append(c)
-            j += 1
-        name = "".join(name_buf)
-
-        while j < n and text[j] in " \t\r\n":
-            j += 1
-        if j >= n or text[j] != ",":
-            i = j
-            continue
-        j += 1
-        while j < n and text[j] in " \t\r\n":
-            j += 1
-        if j >= n or text[j] != "[":
-            i = j
-            continue
-
-        # Extract body up to matching ']'
-        body_start = j + 1
-        depth = 1
-        j += 1
-        while j < n and depth > 0:
-            c = text[j]
-            if c in ("\"", "'"):
-                q = c
-                j += 1
-                while j < n:
-                    cc = text[j]
-                    if cc == "\\" and j + 1 < n:
-                        j += 2
-                        continue
-                    if cc == q:
-                        j += 1
-                        break
-                    j += 1
+            k, sep, v = line.partition("\t")
+            if not sep:
                 continue
-            if c == "[":
-                depth += 1
-            elif c == "]":
-                depth -= 1
-                if depth == 0:
-                    break
-            j += 1
-        if depth != 0:
-            i = pos + len(needle)
-            continue
-        body = text[body_start:j]
-
-        ordered: list[tuple[str, str]] = []
-        # Keep this intentionally narrow: only the primitives we generate in config.ts.
-        # Note: do not over-escape parens in raw regex strings.
-        item_pat = re.compile(
-            r'openApp\(\s*(?P<q1>["\'])(?P<app>.*?)(?P=q1)\s*\)'
-            r'|keystroke\(\s*(?P<q2>["\'])(?P<k>.*?)(?P=q2)\s*\)',
-            re.DOTALL,
-        )
-        for im in item_pat.finditer(body):
-            if im.group("app") is not None:
-                ordered.append(("open_app", im.group("app")))
-            else:
-                ordered.append(("keystroke", im.group("k")))
-        if ordered:
-            out[name] = ordered
-
-        i = j + 1
-
+            k = k.strip()
+            v = v.strip()
+            if k and v:
+                out[k] = v
     return out
 
-
 def classify(
     name: str,
     arc_aliases: dict[str, str],
@@ -221,7 +277,7 @@ def classify(
         app = strip_paren_suffix(tail)
         return "open_app_toggle", app, None
     # Common pattern in config: "open Safari new tab"
-    m = re.match(r"^open\s+(.+?)\s+new\s+tab$", name.strip(), re.IGNORECASE)
+    m = _NEW_TAB_RE.match(name.strip())
     if m:
         app = m.group(1).strip()
         # `open -a <App> about:blank` typically opens a new tab in browsers.
@@ -263,118 +319,63 @@ def classify(
     return "todo", "", None
 
 
+def make_classifier(
+    arc_aliases: dict[str, str],
+    telegram_aliases: dict[str, str],
+    web_aliases: dict[str, str],
+) -> Callable[[str], Tuple[str, str, Optional[str]]]:
+    """Bind the alias maps once; the result is a memoized classify(name)."""
+
+    @functools.lru_cache(maxsize=None)
+    def classify_name(name: str) -> Tuple[str, str, Optional[str]]:
+        return classify(name, arc_aliases, telegram_aliases, web_aliases)
+
+    return classify_name
+
+
 def unique(items: Iterable[str]) -> list[str]:
-    seen = set()
-    out = []
-    for item in items:
-        if item in seen:
-            continue
-        seen.add(item)
-        out.append(item)
-    return out
+    # dicts keep insertion order, so this is an order-preserving dedupe in C.
+    return list(dict.fromkeys(items))
 
 
-def main() -> int:
-    text = CONFIG_PATH.read_text()
-    seq_step_macros = find_seq_step_macros(text)
-    arc_aliases = load_tsv_map(ARC_ALIASES_PATH)
-    telegram_aliases = load_tsv_map(TELEGRAM_ALIASES_PATH)
-    web_aliases = load_tsv_map(WEB_ALIASES_PATH)
-    items = unique(
-        find_call_strings(text, "km")
-        + find_call_strings(text, "seq")
-        + find_call_strings(text, "seqSocket")
-    )
-    lines = [
-        "# Generated from /Users/nikiv/config/i/kar/config.ts",
-        "# Fields: name, action, arg, app (optional)",
-        "# Actions: open_app, open_app_toggle, open_url, session_save, paste_text, switch_window_or_app, keystroke, select_menu_item, click, double_click, right_click, scroll, drag, mouse_move, screenshot, sequence, todo",
-        "",
-    ]
+def _write_macros(
+    out: TextIO,
+    items: list[str],
+    seq_step_macros: dict[str, list[tuple[str, str]]],
+    classify_name: Callable[[str], Tuple[str, str, Optional[str]]],
+) -> None:
+    out.write(_HEADER)
     for name in items:
+        out.write(f'- name: "{escape_yaml(name)}"\n')
         if name in seq_step_macros:
-            lines.append(f'- name: "{escape_yaml(name)}"')
-            lines.append("  action: sequence")
-            lines.append('  arg: ""')
-            lines.append("  steps:")
+            out.write(_SEQUENCE_HEAD)
             for action, arg in seq_step_macros[name]:
-                lines.append(f"    - action: {action}")
-                lines.append(f'      arg: "{escape_yaml(arg)}"')
+                out.write(f'    - action: {action}\n      arg: "{escape_yaml(arg)}"\n')
             continue
 
-        action, arg, app = classify(name, arc_aliases, telegram_aliases, web_aliases)
-        lines.append(f'- name: "{escape_yaml(name)}"')
-        if action == "sequence" and arg.startswith("linear_team:"):
-            team = arg.split(":", 1)[1]
-            lines.append("  action: sequence")
-            lines.append('  arg: ""')
-            lines.append("  steps:")
-            lines.append("    - action: open_app")
-            lines.append('      arg: "Linear"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+1"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+k"')
-            lines.append("    - action: paste_text")
-            lines.append(f'      arg: "team {escape_yaml(team)}"')
-        elif action == "sequence" and arg == "linear_new_task":
-            lines.append("  action: sequence")
-            lines.append('  arg: ""')
-            lines.append("  steps:")
-            lines.append("    - action: open_app")
-            lines.append('      arg: "Linear"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+1"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+n"')
-        elif action == "sequence" and arg == "linear_focus_initiative":
-            # Best-effort port of the current KM macro (cmd+1 then cmd+n).
-            lines.append("  action: sequence")
-            lines.append('  arg: ""')
-            lines.append("  steps:")
-            lines.append("    - action: open_app")
-            lines.append('      arg: "Linear"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+1"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+n"')
-        elif action == "sequence" and arg.startswith("enter:"):
-            text_to_enter = arg.split(":", 1)[1]
-            lines.append("  action: sequence")
-            lines.append('  arg: ""')
-            lines.append("  steps:")
-            lines.append("    - action: paste_text")
-            lines.append(f'      arg: "{escape_yaml(text_to_enter)}"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "return"')
-        elif action == "sequence" and arg == "selection_to_claude":
-            lines.append("  action: sequence")
-            lines.append('  arg: ""')
-            lines.append("  steps:")
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+c"')
-            lines.append("    - action: open_app")
-            lines.append('      arg: "Claude"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+v"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "return"')
-        elif action == "sequence" and arg == "selection_to_lm_studio":
-            lines.append("  action: sequence")
-            lines.append('  arg: ""')
-            lines.append("  steps:")
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+c"')
-            lines.append("    - action: open_app")
-            lines.append('      arg: "LM Studio"')
-            lines.append("    - action: keystroke")
-            lines.append('      arg: "cmd+v"')
+        action, arg, app = classify_name(name)
+        block = _sequence_block(arg) if action == "sequence" else None
+        if block is not None:
+            out.write(block)
         else:
-            lines.append(f"  action: {action}")
-            lines.append(f'  arg: "{escape_yaml(arg)}"')
+            out.write(f'  action: {action}\n  arg: "{escape_yaml(arg)}"\n')
         if app:
-            lines.append(f'  app: "{escape_yaml(app)}"')
-    OUT_PATH.write_text("\n".join(lines) + "\n")
+            out.write(f'  app: "{escape_yaml(app)}"\n')
+
+
+def main() -> int:
+    text = CONFIG_PATH.read_text()
+    calls, seq_step_macros = scan_config(text)
+    classify_name = make_classifier(
+        load_tsv_map(ARC_ALIASES_PATH),
+        load_tsv_map(TELEGRAM_ALIASES_PATH),
+        load_tsv_map(WEB_ALIASES_PATH),
+    )
+    items = unique(calls["km"] + calls["seq"] + calls["seqSocket"])
+    tmp_path = OUT_PATH.with_name(OUT_PATH.name + ".tmp")
+    with tmp_path.open("w") as out:
+        _write_macros(out, items, seq_step_macros, classify_name)
+    os.replace(tmp_path, OUT_PATH)
     print(f"Wrote {OUT_PATH} with {len(items)} macros")
     return 0
 
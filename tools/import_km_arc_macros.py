@@ -1,19 +1,52 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import functools
 import json
+import os
 import re
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, TextIO
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; stdlib json is the fallback.
+    orjson = None
 
 
 SEQ_LOCAL = Path("/Users/nikiv/code/seq/seq.macros.local.yaml")
 KAR_CONFIG = Path("/Users/nikiv/config/i/kar/config.ts")
 
+KM_INSPECT_WORKERS = 8
+
+# km("arc: ...") or seqSocket("arc: ...") or seq("arc: ...", ...)
+# NOTE: keep regex unescaped (raw string) so we match literal "(" in source text.
+_ARC_NAMES_RE = re.compile(rb'\b(?:km|seqSocket|seq)\(\s*"(arc:[^"]+)"')
+
 BEGIN = "# BEGIN km-arc-import"
 END = "# END km-arc-import"
 
+_KEYCODE_TO_TOKEN = {
+    # Digits: these match kVK_ANSI_0..9 codes on macOS (0=29, 1=18, ..., 9=25).
+    18: "1", 19: "2", 20: "3", 21: "4", 23: "5", 22: "6", 26: "7", 28: "8", 25: "9", 29: "0",
+    # Common keys we already parse in seq.
+    48: "tab", 49: "space", 36: "return", 53: "escape",
+}
+
+# KM modifier mask (empirically: cmd=256, ctrl=4096; these align with common KM docs)
+_MOD_BITS = ((4096, "ctrl"), (2048, "opt"), (512, "shift"), (256, "cmd"))
+_MODS_MASK = sum(bit for bit, _ in _MOD_BITS)
+_MODS_TO_TOKENS = {
+    sum(bit for bit, _ in picked): tuple(tok for _, tok in picked)
+    for picked in (
+        [_MOD_BITS[i] for i in range(len(_MOD_BITS)) if combo >> i & 1]
+        for combo in range(1 << len(_MOD_BITS))
+    )
+}
+
 
 def sh(cmd: list[str]) -> str:
     # Keep stderr quiet: most arc:* entries in kar config are seq-native already (no KM macro),
@@ -24,69 +57,124 @@ def sh(cmd: list[str]) -> str:
     return p.stdout
 
 
+def sh_bytes(cmd: list[str]) -> bytes:
+    """Like sh(), but returns raw stdout so JSON can be parsed without a decode pass."""
+    p = subprocess.run(cmd, capture_output=True)
+    if p.returncode != 0:
+        raise subprocess.CalledProcessError(p.returncode, cmd, output=p.stdout, stderr=p.stderr)
+    return p.stdout
+
+
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # stdlib decides: it accepts what orjson rejects (e.g. NaN, lone surrogates)
+    return json.loads(data)
+
+
+@functools.lru_cache(maxsize=None)
 def km_inspect(name: str) -> list[dict] | None:
     try:
-        out = sh(["km", "inspect", name])
+        out = sh_bytes(["km", "inspect", name])
     except subprocess.CalledProcessError:
         return None
     try:
-        return json.loads(out)
+        return _json_loads(out)
     except Exception:
         return None
 
 
+# MacroUID -> macro name (None if KM does not know it); filled in bulk by
+# resolve_macro_names so most lookups never start osascript.
+_MACRO_NAME_BY_ID: dict[str, str | None] = {}
+
+
+def _applescript_str(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
 def km_macro_name_by_id(uid: str) -> str | None:
+    if uid in _MACRO_NAME_BY_ID:
+        return _MACRO_NAME_BY_ID[uid]
     script = (
         'tell application "Keyboard Maestro" to get name of first macro whose id is "{}"'.format(uid)
     )
     try:
-        return sh(["osascript", "-e", script]).strip() or None
+        name = sh(["osascript", "-e", script]).strip() or None
+    except subprocess.CalledProcessError:
+        name = None
+    _MACRO_NAME_BY_ID[uid] = name
+    return name
+
+
+def resolve_macro_names(uids: list[str]) -> None:
+    """Look up the names of many macro UIDs with a single osascript run."""
+    todo = [uid for uid in dict.fromkeys(uids) if uid not in _MACRO_NAME_BY_ID]
+    if not todo:
+        return
+    script = "\n".join([
+        'set out to {}',
+        'tell application "Keyboard Maestro"',
+        '  repeat with u in {' + ", ".join(map(_applescript_str, todo)) + '}',
+        '    try',
+        '      set end of out to name of first macro whose id is (contents of u)',
+        '    on error',
+        '      set end of out to ""',
+        '    end try',
+        '  end repeat',
+        'end tell',
+        "set AppleScript's text item delimiters to linefeed",
+        'return out as text',
+    ])
+    try:
+        out = sh(["osascript", "-e", script])
+    except subprocess.CalledProcessError:
+        return  # leave them to the one-at-a-time path
+    names = out[:-1].split("\n") if out.endswith("\n") else out.split("\n")
+    if len(names) != len(todo):
+        return  # a name with a newline in it; not worth guessing
+    for uid, name in zip(todo, names):
+        _MACRO_NAME_BY_ID[uid] = name.strip() or None
+
+
+def km_macro_names() -> set[str] | None:
+    """Names of every KM macro via one osascript run (None if KM can't be asked)."""
+    script = "\n".join([
+        'tell application "Keyboard Maestro" to set out to name of every macro',
+        "set AppleScript's text item delimiters to linefeed",
+        'return out as text',
+    ])
+    try:
+        out = sh(["osascript", "-e", script])
     except subprocess.CalledProcessError:
         return None
+    return set(out.split("\n"))
+
+
+def execute_macro_uids(actions: list[dict]) -> list[str]:
+    uids: list[str] = []
+    for a in actions:
+        if a.get("MacroActionType") == "ExecuteMacro":
+            uid = a.get("MacroUID")
+            if isinstance(uid, str) and uid:
+                uids.append(uid)
+    return uids
 
 
-def find_arc_names_in_config(text: str) -> list[str]:
-    names: list[str] = []
-    seen = set()
-    # km("arc: ...") or seqSocket("arc: ...") or seq("arc: ...", ...)
-    # NOTE: keep regex unescaped (raw string) so we match literal "(" in source text.
-    for m in re.finditer(r'\b(?:km|seqSocket|seq)\(\s*"(?P<name>arc:[^"]+)"', text):
-        n = m.group("name")
-        if n not in seen:
-            seen.add(n)
-            names.append(n)
-    return names
+def find_arc_names_in_config(text: bytes) -> list[str]:
+    # Config is pure-ASCII syntax around the names, so match on raw bytes and
+    # only decode the captured names.
+    return list(dict.fromkeys(m.group(1).decode("utf-8") for m in _ARC_NAMES_RE.finditer(text)))
 
 
 def keycode_to_token(keycode: int) -> str | None:
-    # Digits: these match kVK_ANSI_0..9 codes on macOS (0=29, 1=18, ..., 9=25).
-    digits = {18: "1", 19: "2", 20: "3", 21: "4", 23: "5", 22: "6", 26: "7", 28: "8", 25: "9", 29: "0"}
-    if keycode in digits:
-        return digits[keycode]
-    # Common keys we already parse in seq.
-    if keycode == 48:
-        return "tab"
-    if keycode == 49:
-        return "space"
-    if keycode == 36:
-        return "return"
-    if keycode == 53:
-        return "escape"
-    return None
+    return _KEYCODE_TO_TOKEN.get(keycode)
 
 
 def mods_to_tokens(mods: int) -> list[str]:
-    # KM modifier mask (empirically: cmd=256, ctrl=4096; these align with common KM docs)
-    out: list[str] = []
-    if mods & 4096:
-        out.append("ctrl")
-    if mods & 2048:
-        out.append("opt")
-    if mods & 512:
-        out.append("shift")
-    if mods & 256:
-        out.append("cmd")
-    return out
+    return list(_MODS_TO_TOKENS[mods & _MODS_MASK])
 
 
 def km_keystroke_to_spec(action: dict) -> str | None:
@@ -115,21 +203,19 @@ def extract_arc_sequence(macro_name: str) -> ArcSeq | None:
     if not actions:
         return None
 
-    # We only handle Arc-focused macros.
-    app_name = None
-    for a in actions:
-        if a.get("MacroActionType") == "ActivateApplication":
-            app = (a.get("Application") or {}).get("Name")
-            if isinstance(app, str):
-                app_name = app
-            break
-    if app_name != "Arc":
-        return None
-
+    # We only handle Arc-focused macros: the first ActivateApplication decides,
+    # and steps seen before it are kept only if it turns out to be Arc.
+    activated = False
     steps: list[tuple[str, str, str | None]] = [("open_app", "Arc", None)]
 
     for a in actions:
         t = a.get("MacroActionType")
+        if t == "ActivateApplication" and not activated:
+            if (a.get("Application") or {}).get("Name") != "Arc":
+                return None
+            activated = True
+            continue
+
         if t == "ExecuteMacro":
             uid = a.get("MacroUID")
             if not isinstance(uid, str) or not uid:
@@ -164,56 +250,71 @@ def extract_arc_sequence(macro_name: str) -> ArcSeq | None:
                 steps.append(("keystroke", spec, None))
             continue
 
-    if len(steps) <= 1:
+    if not activated or len(steps) <= 1:
         return None
     return ArcSeq(name=macro_name, steps=steps)
 
 
-def render_yaml(seqs: list[ArcSeq]) -> str:
-    def esc(s: str) -> str:
-        return s.replace("\\", "\\\\").replace('"', '\\"')
+def escape_yaml(s: str) -> str:
+    if "\\" not in s and '"' not in s:
+        return s
+    return s.replace("\\", "\\\\").replace('"', '\\"')
+
 
-    lines: list[str] = []
-    lines.append(BEGIN)
-    lines.append("# Generated from Keyboard Maestro arc:* macros (do not edit by hand).")
+def render_yaml(seqs: list[ArcSeq], out: TextIO) -> None:
+    out.write(BEGIN + "\n")
+    out.write("# Generated from Keyboard Maestro arc:* macros (do not edit by hand).\n")
     for s in seqs:
-        lines.append(f'- name: "{esc(s.name)}"')
-        lines.append("  action: sequence")
-        lines.append('  arg: ""')
-        lines.append("  steps:")
+        out.write(f'- name: "{escape_yaml(s.name)}"\n  action: sequence\n  arg: ""\n  steps:\n')
         for action, arg, app in s.steps:
-            lines.append(f"    - action: {action}")
+            out.write(f"    - action: {action}\n")
             if app:
-                lines.append(f'      app: "{app}"')
-            lines.append(f'      arg: "{esc(arg)}"')
-    lines.append(END)
-    return "\n".join(lines) + "\n"
+                out.write(f'      app: "{app}"\n')
+            out.write(f'      arg: "{escape_yaml(arg)}"\n')
+    out.write(END + "\n")
 
 
 def main() -> int:
-    cfg = KAR_CONFIG.read_text()
+    cfg = KAR_CONFIG.read_bytes()
     names = find_arc_names_in_config(cfg)
+    # Most arc:* names are seq-native with no KM macro behind them; don't spend a
+    # `km inspect` process on each just to hear "not found".
+    known = km_macro_names()
+    if known is not None:
+        names = [n for n in names if n in known]
+    # Inspect everything up front (cached), then resolve every sub-macro UID at
+    # once. `km inspect` is subprocess-bound, so the inspections run in parallel.
+    with ThreadPoolExecutor(max_workers=KM_INSPECT_WORKERS) as ex:
+        uids: list[str] = []
+        for actions in ex.map(km_inspect, names):
+            uids.extend(execute_macro_uids(actions or []))
+        resolve_macro_names(uids)
+        subnames = {_MACRO_NAME_BY_ID.get(uid) for uid in uids} - {None}
+        list(ex.map(km_inspect, subnames))
     seqs: list[ArcSeq] = []
     for n in names:
         s = extract_arc_sequence(n)
         if s:
             seqs.append(s)
 
-    if not SEQ_LOCAL.exists():
-        SEQ_LOCAL.write_text(render_yaml(seqs))
+    # Stream the result into a temp file next to SEQ_LOCAL and swap it in.
+    text = SEQ_LOCAL.read_text() if SEQ_LOCAL.exists() else None
+    tmp_path = SEQ_LOCAL.with_name(SEQ_LOCAL.name + ".tmp")
+    with tmp_path.open("w") as out:
+        if text is None:
+            render_yaml(seqs, out)
+        elif BEGIN in text and END in text:
+            out.write(text.split(BEGIN, 1)[0])
+            render_yaml(seqs, out)
+            out.write(text.split(END, 1)[1].lstrip("\n"))
+        else:
+            out.write(text.rstrip() + "\n\n")
+            render_yaml(seqs, out)
+    os.replace(tmp_path, SEQ_LOCAL)
+    if text is None:
         print(f"wrote {SEQ_LOCAL} ({len(seqs)} macros)")
-        return 0
-
-    text = SEQ_LOCAL.read_text()
-    block = render_yaml(seqs)
-    if BEGIN in text and END in text:
-        pre = text.split(BEGIN, 1)[0]
-        post = text.split(END, 1)[1]
-        out = pre + block + post.lstrip("\n")
     else:
-        out = text.rstrip() + "\n\n" + block
-    SEQ_LOCAL.write_text(out)
-    print(f"updated {SEQ_LOCAL} ({len(seqs)} macros)")
+        print(f"updated {SEQ_LOCAL} ({len(seqs)} macros)")
     return 0
 
 
@@ -5,18 +5,25 @@ from __future__ import annotations
 
 import argparse
 import json
+import operator
 import sys
 from pathlib import Path
 from typing import Any
 
 
 def _load(path: Path) -> dict[str, Any]:
-    payload = json.loads(path.read_text(encoding="utf-8"))
+    # json.loads detects UTF-8 on bytes itself; no separate decode pass.
+    payload = json.loads(path.read_bytes())
     if not isinstance(payload, dict):
         raise ValueError(f"{path} is not JSON object")
     return payload
 
 
+def _as_dict(obj: dict[str, Any], key: str) -> dict[str, Any]:
+    value = obj.get(key)
+    return value if isinstance(value, dict) else {}
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Audit Kar RL signal export summary")
     parser.add_argument("--summary", required=True, help="summary.json from kar_signal_export")
@@ -32,10 +39,9 @@ def main() -> int:
     summary_path = Path(args.summary).expanduser().resolve()
     s = _load(summary_path)
 
-    counts = s.get("counts") if isinstance(s.get("counts"), dict) else {}
-    quality = s.get("quality") if isinstance(s.get("quality"), dict) else {}
-    dist = s.get("distributions") if isinstance(s.get("distributions"), dict) else {}
-    outcome_dist = dist.get("outcomes") if isinstance(dist.get("outcomes"), dict) else {}
+    counts = _as_dict(s, "counts")
+    quality = _as_dict(s, "quality")
+    outcome_dist = _as_dict(_as_dict(s, "distributions"), "outcomes")
 
     intents = int(counts.get("intents") or 0)
     joined = int(counts.get("joined_rows") or 0)
@@ -43,43 +49,20 @@ def main() -> int:
     link_rate = float(quality.get("intent_outcome_link_rate") or 0.0)
     action_dom = float(quality.get("action_dominance") or 1.0)
 
-    failureish = 0
-    for k in ("partial", "failure", "wasted"):
-        v = outcome_dist.get(k)
-        if isinstance(v, int):
-            failureish += v
-
+    # Only int counts add up; null or malformed entries are ignored.
+    failureish = sum(v for v in map(outcome_dist.get, ("partial", "failure", "wasted")) if isinstance(v, int))
+
+    gate_specs = (
+        ("min_intents", intents, args.min_intents, operator.ge),
+        ("min_joined", joined, args.min_joined, operator.ge),
+        ("min_link_rate", link_rate, args.min_link_rate, operator.ge),
+        ("max_action_dominance", action_dom, args.max_action_dominance, operator.le),
+        ("min_overrides", overrides, args.min_overrides, operator.ge),
+        ("min_failureish", failureish, args.min_failureish, operator.ge),
+    )
     gates = {
-        "min_intents": {
-            "actual": intents,
-            "threshold": args.min_intents,
-            "pass": intents >= args.min_intents,
-        },
-        "min_joined": {
-            "actual": joined,
-            "threshold": args.min_joined,
-            "pass": joined >= args.min_joined,
-        },
-        "min_link_rate": {
-            "actual": link_rate,
-            "threshold": args.min_link_rate,
-            "pass": link_rate >= args.min_link_rate,
-        },
-        "max_action_dominance": {
-            "actual": action_dom,
-            "threshold": args.max_action_dominance,
-            "pass": action_dom <= args.max_action_dominance,
-        },
-        "min_overrides": {
-            "actual": overrides,
-            "threshold": args.min_overrides,
-            "pass": overrides >= args.min_overrides,
-        },
-        "min_failureish": {
-            "actual": failureish,
-            "threshold": args.min_failureish,
-            "pass": failureish >= args.min_failureish,
-        },
+        name: {"actual": actual, "threshold": threshold, "pass": cmp(actual, threshold)}
+        for name, actual, threshold, cmp in gate_specs
     }
 
     ok = all(g["pass"] for g in gates.values())
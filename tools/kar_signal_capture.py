@@ -17,38 +17,97 @@ from __future__ import annotations
 
 import argparse
 import hashlib
+import heapq
 import json
 import os
+import queue
+import select
 import signal
 import subprocess
 import sys
+import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
 
 from seq_mem_sink import append_seq_mem_rows
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
 DEFAULT_SEQ_MEM_PATH = str(Path("~/repos/ClickHouse/ClickHouse/user_files/seq_mem.jsonl").expanduser())
 DEFAULT_STATE_PATH = str(Path("~/.local/state/seq/kar_signal_state.json").expanduser())
 DEFAULT_PIDFILE = str(Path("~/.local/state/seq/kar_signal.pid").expanduser())
 DEFAULT_LOG_PATH = str(Path("~/code/seq/cli/cpp/out/logs/kar_signal_capture.log").expanduser())
+READ_CHUNK_BYTES = 1 << 18
+EMIT_BATCH_ROWS = 64
 
-SOURCE_NAMES = {
+SOURCE_NAMES = frozenset({
     "seqd.run",
     "cli.run.local",
     "seqd.open_app_toggle",
     "cli.open_app_toggle.action",
     "app.activate",
-}
-ZMODE_POLICY_NAMES = {
+})
+ZMODE_POLICY_NAMES = frozenset({
     "zmode.policy.decision.v1",
     "zmode.policy.apply.v1",
-}
+})
 
 
-@dataclass
+def _json_loads(raw: bytes | str) -> Any:
+    """Decode JSON with orjson when installed.
+
+    Anything orjson rejects (blank lines, invalid UTF-8, NaN, >64-bit ints)
+    goes through the stdlib so accepted input is the same either way.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", errors="replace")
+    return json.loads(raw)
+
+
+def _watch_file(fh: BinaryIO) -> Any:
+    """kqueue that wakes on appends to, or rotation/removal of, `fh`.
+
+    Returns None where kqueue is unavailable (e.g. Linux); callers then fall
+    back to sleeping for the poll interval.
+    """
+    if not hasattr(select, "kqueue"):
+        return None
+    try:
+        kq = select.kqueue()
+        kq.control(
+            [
+                select.kevent(
+                    fh.fileno(),
+                    filter=select.KQ_FILTER_VNODE,
+                    flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                    fflags=(
+                        select.KQ_NOTE_WRITE
+                        | select.KQ_NOTE_EXTEND
+                        | select.KQ_NOTE_DELETE
+                        | select.KQ_NOTE_RENAME
+                    ),
+                )
+            ],
+            0,
+            0,
+        )
+    except OSError:
+        return None
+    return kq
+
+
+@dataclass(slots=True)
 class PendingIntent:
     decision_id: str
     session_id: str
@@ -104,8 +163,23 @@ class KarSignalCapture:
         self.offset = 0
         self.inode = 0
         self.pending: dict[str, PendingIntent] = {}
+        # Views of `pending` for the per-row lookups; kept in step by
+        # _add_pending/_drop_pending. Buckets keep insertion order.
+        self.pending_by_session: dict[str, dict[str, PendingIntent]] = {}
+        self.pending_by_target: dict[tuple[str, str], dict[str, PendingIntent]] = {}
+        # Min-heap of (expired_at_ms, insertion seq, intent). Entries for
+        # intents already resolved or replaced are skipped when popped.
+        self.pending_expiry: list[tuple[int, int, PendingIntent]] = []
+        self.pending_seq = 0
         self.zmode_decisions: dict[str, dict[str, Any]] = {}
         self.active_zmode: ActiveZModePolicy | None = None
+        self.emit_buf: list[dict[str, Any]] = []
+        # Sink writes run on this thread during `run`; None means write inline.
+        self._writer: threading.Thread | None = None
+        self._write_q: queue.Queue[list[dict[str, Any]] | None] = queue.Queue()
+        # First sink failure seen by the writer thread; re-raised on the tail
+        # thread so the offset is never saved past rows that were not written.
+        self._write_error: Exception | None = None
 
         self.rows_seen = 0
         self.rows_emitted = 0
@@ -132,7 +206,7 @@ class KarSignalCapture:
             return subj
         if isinstance(subj, str):
             try:
-                parsed = json.loads(subj)
+                parsed = _json_loads(subj)
                 if isinstance(parsed, dict):
                     return parsed
             except Exception:
@@ -235,12 +309,11 @@ class KarSignalCapture:
             return
         if not data:
             return
-        for line in data.decode("utf-8", errors="replace").splitlines():
-            raw = line.strip()
-            if not raw:
+        for line in data.split(b"\n"):
+            if not line.strip():
                 continue
             try:
-                row = json.loads(raw)
+                row = _json_loads(line)
             except Exception:
                 continue
             if not isinstance(row, dict):
@@ -261,6 +334,8 @@ class KarSignalCapture:
         action_name: str,
         target_app: str = "",
     ) -> dict[str, Any]:
+        """Policy fields for an intent, typed as the emit/PendingIntent keywords
+        they are splatted into (strings, plus an int apply timestamp)."""
         active = self.active_zmode
         if active is None:
             return {
@@ -300,20 +375,64 @@ class KarSignalCapture:
             f"{name}|{session_id}|{subject_obj.get('decision_id','')}|"
             f"{subject_obj.get('source_event_id','')}|{subject_obj.get('override_decision_id','')}"
         )
+        subject = self._safe_json(subject_obj)
         return {
             "ts_ms": int(ts_ms),
             "dur_us": 0,
             "ok": bool(ok),
             "session_id": session_id,
             "event_id": event_id,
-            "content_hash": self._sha(self._safe_json(subject_obj)),
+            "content_hash": self._sha(subject),
             "name": name,
-            "subject": self._safe_json(subject_obj),
+            "subject": subject,
         }
 
     def _append_row(self, row: dict[str, Any]) -> None:
-        append_seq_mem_rows([row], local_path=self.cfg.seq_mem_path)
-        self.rows_emitted += 1
+        self.emit_buf.append(row)
+        if len(self.emit_buf) >= EMIT_BATCH_ROWS:
+            self._flush_emit()
+
+    def _flush_emit(self) -> None:
+        if not self.emit_buf:
+            return
+        self._raise_write_error()
+        if self._writer is not None:
+            self._write_q.put(self.emit_buf)
+        else:
+            append_seq_mem_rows(self.emit_buf, local_path=self.cfg.seq_mem_path)
+        self.rows_emitted += len(self.emit_buf)
+        self.emit_buf = []
+
+    def _writer_loop(self) -> None:
+        while True:
+            rows = self._write_q.get()
+            try:
+                if rows is None:
+                    return
+                # Later batches are dropped once one fails; they are re-derived
+                # on restart since the offset is not saved past the failure.
+                if self._write_error is None:
+                    append_seq_mem_rows(rows, local_path=self.cfg.seq_mem_path)
+            except Exception as exc:
+                self.log(f"seq_mem sink write failed: {exc}")
+                self._write_error = exc
+            finally:
+                self._write_q.task_done()
+
+    def _raise_write_error(self) -> None:
+        if self._write_error is not None:
+            raise self._write_error
+
+    def _start_writer(self) -> None:
+        self._writer = threading.Thread(target=self._writer_loop, name="kar-signal-writer", daemon=True)
+        self._writer.start()
+
+    def _stop_writer(self) -> None:
+        if self._writer is None:
+            return
+        self._write_q.put(None)
+        self._writer.join()
+        self._writer = None
 
     def _emit_intent(
         self,
@@ -497,6 +616,11 @@ class KarSignalCapture:
         now = time.time()
         if not force and (now - self.last_state_save) < 1.0:
             return
+        # Rows derived from everything before `offset` must be on disk first.
+        self._flush_emit()
+        if self._writer is not None:
+            self._write_q.join()
+        self._raise_write_error()
         payload = {
             "schema_version": "kar_signal_state_v1",
             "updated_at": datetime.now(timezone.utc).isoformat(),
@@ -510,36 +634,61 @@ class KarSignalCapture:
         self.cfg.state_path.write_text(json.dumps(payload, ensure_ascii=True, indent=2) + "\n", encoding="utf-8")
         self.last_state_save = now
 
+    def _add_pending(self, p: PendingIntent) -> None:
+        if p.decision_id in self.pending:
+            self._drop_pending(p.decision_id)
+        self.pending[p.decision_id] = p
+        self.pending_by_session.setdefault(p.session_id, {})[p.decision_id] = p
+        self.pending_by_target.setdefault((p.session_id, p.target_app), {})[p.decision_id] = p
+        self.pending_seq += 1
+        heapq.heappush(self.pending_expiry, (p.expired_at_ms, self.pending_seq, p))
+
+    def _drop_pending(self, decision_id: str) -> None:
+        p = self.pending.pop(decision_id, None)
+        if p is None:
+            return
+        for index, key in (
+            (self.pending_by_session, p.session_id),
+            (self.pending_by_target, (p.session_id, p.target_app)),
+        ):
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(decision_id, None)
+                if not bucket:
+                    del index[key]
+
     def _expire_pending(self, now_ts_ms: int) -> None:
-        expired_ids: list[str] = []
-        for decision_id, p in self.pending.items():
-            if p.resolved:
-                expired_ids.append(decision_id)
-                continue
-            if now_ts_ms >= p.expired_at_ms:
-                self._emit_outcome(
-                    ts_ms=now_ts_ms,
-                    session_id=p.session_id,
-                    decision_id=p.decision_id,
-                    source_event_id=p.source_event_id,
-                    action_type=p.action_type,
-                    action_name=p.action_name,
-                    target_app=p.target_app,
-                    outcome="wasted",
-                    latency_ms=now_ts_ms - p.ts_ms,
-                    observed_app="",
-                    reason="no_matching_app_activate_within_window",
-                    mapping_epoch_id=p.mapping_epoch_id,
-                    zmode_policy_decision_id=p.zmode_policy_decision_id,
-                    candidate_id=p.candidate_id,
-                    candidate_key=p.candidate_key,
-                    candidate_action=p.candidate_action,
-                    policy_apply_ts_ms=p.policy_apply_ts_ms,
-                )
-                p.resolved = True
-                expired_ids.append(decision_id)
-        for d in expired_ids:
-            self.pending.pop(d, None)
+        heap = self.pending_expiry
+        due: list[tuple[int, PendingIntent]] = []
+        while heap and heap[0][0] <= now_ts_ms:
+            _, seq, p = heapq.heappop(heap)
+            if not p.resolved and self.pending.get(p.decision_id) is p:
+                due.append((seq, p))
+        # Emit in insertion order, as the old full scan did; ts_ms isn't
+        # monotonic, so expiry order can differ from it.
+        due.sort(key=lambda item: item[0])
+        for _, p in due:
+            self._emit_outcome(
+                ts_ms=now_ts_ms,
+                session_id=p.session_id,
+                decision_id=p.decision_id,
+                source_event_id=p.source_event_id,
+                action_type=p.action_type,
+                action_name=p.action_name,
+                target_app=p.target_app,
+                outcome="wasted",
+                latency_ms=now_ts_ms - p.ts_ms,
+                observed_app="",
+                reason="no_matching_app_activate_within_window",
+                mapping_epoch_id=p.mapping_epoch_id,
+                zmode_policy_decision_id=p.zmode_policy_decision_id,
+                candidate_id=p.candidate_id,
+                candidate_key=p.candidate_key,
+                candidate_action=p.candidate_action,
+                policy_apply_ts_ms=p.policy_apply_ts_ms,
+            )
+            p.resolved = True
+            self._drop_pending(p.decision_id)
 
     def _handle_override(
         self,
@@ -554,8 +703,8 @@ class KarSignalCapture:
         new_candidate_key: str = "",
     ) -> None:
         latest: PendingIntent | None = None
-        for p in self.pending.values():
-            if p.session_id != session_id or p.resolved:
+        for p in self.pending_by_session.get(session_id, {}).values():
+            if p.resolved:
                 continue
             if latest is None or p.ts_ms > latest.ts_ms:
                 latest = p
@@ -635,283 +784,308 @@ class KarSignalCapture:
             )
         latest.resolved = True
         latest.overridden_by = new_decision_id
+        self._drop_pending(latest.decision_id)
 
-    def _handle_row(self, row: dict[str, Any]) -> None:
-        name = str(row.get("name") or "")
-        if not name or name.startswith("kar."):
-            self.rows_skipped += 1
-            return
-        if name in ZMODE_POLICY_NAMES:
-            subject = self._subject(row)
-            if name == "zmode.policy.decision.v1":
-                self._record_zmode_decision(row, subject)
-            elif name == "zmode.policy.apply.v1":
-                self._activate_zmode_policy(row, subject)
-            return
-        if name not in SOURCE_NAMES:
-            self.rows_skipped += 1
-            return
+    def _handle_run(
+        self, row: dict[str, Any], name: str, ts_ms: int, session_id: str, source_event_id: str
+    ) -> None:
+        """Intent plus immediate outcome for a macro run (`seqd.run`, `cli.run.local`)."""
+        macro_name = str(row.get("subject") or "").strip()
+        decision_id = self._sha(f"kar.intent|{name}|{source_event_id}")
+        zmeta = self._resolve_zmode_metadata(
+            action_type="run_macro",
+            action_name=macro_name,
+        )
+        self._emit_intent(
+            ts_ms=ts_ms,
+            session_id=session_id,
+            decision_id=decision_id,
+            source_event_id=source_event_id,
+            source_event_name=name,
+            action_type="run_macro",
+            action_name=macro_name,
+            macro_name=macro_name,
+            target_app="",
+            front_app="",
+            prev_app="",
+            decision="run",
+            **zmeta,
+        )
 
-        ts_ms = int(row.get("ts_ms") or 0)
-        if ts_ms <= 0:
-            ts_ms = int(time.time() * 1000)
-        session_id = str(row.get("session_id") or "") or "kar"
-        source_event_id = str(row.get("event_id") or self._sha(self._safe_json(row)))
+        ok = bool(row.get("ok"))
+        self._emit_outcome(
+            ts_ms=ts_ms,
+            session_id=session_id,
+            decision_id=decision_id,
+            source_event_id=source_event_id,
+            action_type="run_macro",
+            action_name=macro_name,
+            target_app="",
+            outcome="partial" if ok else "failure",
+            latency_ms=int((row.get("dur_us") or 0) / 1000),
+            observed_app="",
+            reason=f"{name}_returned_ok" if ok else f"{name}_failed",
+            **zmeta,
+        )
 
-        self._expire_pending(ts_ms)
+    def _handle_seqd_open_toggle(
+        self, row: dict[str, Any], name: str, ts_ms: int, session_id: str, source_event_id: str
+    ) -> None:
+        """Intent from seqd's open-app toggle; outcome waits for `app.activate`."""
+        target = str(row.get("subject") or "").strip()
+        decision = "open_target"
+        action_name = f"open_app_toggle:{decision}:{target or 'unknown'}"
+        decision_id = self._sha(f"kar.intent|seqd.open_app_toggle|{source_event_id}|{target}")
+        zmeta = self._resolve_zmode_metadata(
+            action_type="open_app_toggle",
+            action_name=action_name,
+            target_app=target,
+        )
 
-        if name in {"seqd.run", "cli.run.local"}:
-            macro_name = str(row.get("subject") or "").strip()
-            decision_id = self._sha(f"kar.intent|{name}|{source_event_id}")
-            zmeta = self._resolve_zmode_metadata(
-                action_type="run_macro",
-                action_name=macro_name,
-            )
-            self._emit_intent(
-                ts_ms=ts_ms,
-                session_id=session_id,
-                decision_id=decision_id,
-                source_event_id=source_event_id,
-                source_event_name=name,
-                action_type="run_macro",
-                action_name=macro_name,
-                macro_name=macro_name,
-                target_app="",
-                front_app="",
-                prev_app="",
-                decision="run",
-                mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                candidate_id=str(zmeta.get("candidate_id") or ""),
-                candidate_key=str(zmeta.get("candidate_key") or ""),
-                candidate_action=str(zmeta.get("candidate_action") or ""),
-                policy_apply_ts_ms=int(zmeta.get("policy_apply_ts_ms") or 0),
-            )
+        self._handle_override(
+            ts_ms=ts_ms,
+            session_id=session_id,
+            new_decision_id=decision_id,
+            new_action_name=action_name,
+            new_mapping_epoch_id=zmeta["mapping_epoch_id"],
+            new_zmode_policy_decision_id=zmeta["zmode_policy_decision_id"],
+            new_candidate_id=zmeta["candidate_id"],
+            new_candidate_key=zmeta["candidate_key"],
+        )
 
-            ok = bool(row.get("ok"))
+        self._emit_intent(
+            ts_ms=ts_ms,
+            session_id=session_id,
+            decision_id=decision_id,
+            source_event_id=source_event_id,
+            source_event_name=name,
+            action_type="open_app_toggle",
+            action_name=action_name,
+            macro_name="",
+            target_app=target,
+            front_app="",
+            prev_app="",
+            decision=decision,
+            **zmeta,
+        )
+
+        if target:
+            self._add_pending(
+                PendingIntent(
+                    decision_id=decision_id,
+                    session_id=session_id,
+                    ts_ms=ts_ms,
+                    action_type="open_app_toggle",
+                    action_name=action_name,
+                    target_app=target,
+                    source_event_id=source_event_id,
+                    expired_at_ms=ts_ms + self.cfg.outcome_window_ms,
+                    **zmeta,
+                )
+            )
+        else:
             self._emit_outcome(
                 ts_ms=ts_ms,
                 session_id=session_id,
                 decision_id=decision_id,
                 source_event_id=source_event_id,
-                action_type="run_macro",
-                action_name=macro_name,
+                action_type="open_app_toggle",
+                action_name=action_name,
                 target_app="",
-                outcome="partial" if ok else "failure",
-                latency_ms=int((row.get("dur_us") or 0) / 1000),
+                outcome="failure",
+                latency_ms=0,
                 observed_app="",
-                reason=f"{name}_returned_ok" if ok else f"{name}_failed",
-                mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                candidate_id=str(zmeta.get("candidate_id") or ""),
-                candidate_key=str(zmeta.get("candidate_key") or ""),
-                candidate_action=str(zmeta.get("candidate_action") or ""),
-                policy_apply_ts_ms=int(zmeta.get("policy_apply_ts_ms") or 0),
+                reason="missing_target_in_seqd_open_app_toggle",
+                **zmeta,
             )
-            return
 
-        if name == "seqd.open_app_toggle":
-            target = str(row.get("subject") or "").strip()
-            decision = "open_target"
-            action_name = f"open_app_toggle:{decision}:{target or 'unknown'}"
-            decision_id = self._sha(f"kar.intent|seqd.open_app_toggle|{source_event_id}|{target}")
-            zmeta = self._resolve_zmode_metadata(
-                action_type="open_app_toggle",
-                action_name=action_name,
-                target_app=target,
-            )
+    def _handle_cli_open_toggle(
+        self, row: dict[str, Any], name: str, ts_ms: int, session_id: str, source_event_id: str
+    ) -> None:
+        """Intent from the CLI toggle, whose subject carries target/front/prev/decision."""
+        raw_subj = str(row.get("subject") or "")
+        parsed = self._parse_open_toggle_subject(raw_subj)
+        target = parsed.get("target", "")
+        front = parsed.get("front", "")
+        prev = parsed.get("prev", "")
+        decision = parsed.get("decision", "")
+        expected_app = prev if (decision == "open_prev" and prev) else target
+        action_name = f"open_app_toggle:{decision or 'unknown'}:{target or 'unknown'}"
+        decision_id = self._sha(f"kar.intent|open_toggle|{source_event_id}|{expected_app}|{decision}")
+        zmeta = self._resolve_zmode_metadata(
+            action_type="open_app_toggle",
+            action_name=action_name,
+            target_app=expected_app,
+        )
 
-            self._handle_override(
-                ts_ms=ts_ms,
-                session_id=session_id,
-                new_decision_id=decision_id,
-                new_action_name=action_name,
-                new_mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                new_zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                new_candidate_id=str(zmeta.get("candidate_id") or ""),
-                new_candidate_key=str(zmeta.get("candidate_key") or ""),
-            )
+        self._handle_override(
+            ts_ms=ts_ms,
+            session_id=session_id,
+            new_decision_id=decision_id,
+            new_action_name=action_name,
+            new_mapping_epoch_id=zmeta["mapping_epoch_id"],
+            new_zmode_policy_decision_id=zmeta["zmode_policy_decision_id"],
+            new_candidate_id=zmeta["candidate_id"],
+            new_candidate_key=zmeta["candidate_key"],
+        )
 
-            self._emit_intent(
-                ts_ms=ts_ms,
-                session_id=session_id,
-                decision_id=decision_id,
-                source_event_id=source_event_id,
-                source_event_name=name,
-                action_type="open_app_toggle",
-                action_name=action_name,
-                macro_name="",
-                target_app=target,
-                front_app="",
-                prev_app="",
-                decision=decision,
-                mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                candidate_id=str(zmeta.get("candidate_id") or ""),
-                candidate_key=str(zmeta.get("candidate_key") or ""),
-                candidate_action=str(zmeta.get("candidate_action") or ""),
-                policy_apply_ts_ms=int(zmeta.get("policy_apply_ts_ms") or 0),
-            )
+        self._emit_intent(
+            ts_ms=ts_ms,
+            session_id=session_id,
+            decision_id=decision_id,
+            source_event_id=source_event_id,
+            source_event_name=name,
+            action_type="open_app_toggle",
+            action_name=action_name,
+            macro_name="",
+            target_app=expected_app,
+            front_app=front,
+            prev_app=prev,
+            decision=decision,
+            **zmeta,
+        )
 
-            if target:
-                self.pending[decision_id] = PendingIntent(
+        if expected_app:
+            self._add_pending(
+                PendingIntent(
                     decision_id=decision_id,
                     session_id=session_id,
                     ts_ms=ts_ms,
                     action_type="open_app_toggle",
                     action_name=action_name,
-                    target_app=target,
+                    target_app=expected_app,
                     source_event_id=source_event_id,
                     expired_at_ms=ts_ms + self.cfg.outcome_window_ms,
-                    mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                    zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                    candidate_id=str(zmeta.get("candidate_id") or ""),
-                    candidate_key=str(zmeta.get("candidate_key") or ""),
-                    candidate_action=str(zmeta.get("candidate_action") or ""),
-                    policy_apply_ts_ms=int(zmeta.get("policy_apply_ts_ms") or 0),
-                )
-            else:
-                self._emit_outcome(
-                    ts_ms=ts_ms,
-                    session_id=session_id,
-                    decision_id=decision_id,
-                    source_event_id=source_event_id,
-                    action_type="open_app_toggle",
-                    action_name=action_name,
-                    target_app="",
-                    outcome="failure",
-                    latency_ms=0,
-                    observed_app="",
-                    reason="missing_target_in_seqd_open_app_toggle",
-                    mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                    zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                    candidate_id=str(zmeta.get("candidate_id") or ""),
-                    candidate_key=str(zmeta.get("candidate_key") or ""),
-                    candidate_action=str(zmeta.get("candidate_action") or ""),
-                    policy_apply_ts_ms=int(zmeta.get("policy_apply_ts_ms") or 0),
+                    **zmeta,
                 )
-            return
-
-        if name == "cli.open_app_toggle.action":
-            raw_subj = str(row.get("subject") or "")
-            parsed = self._parse_open_toggle_subject(raw_subj)
-            target = parsed.get("target", "")
-            front = parsed.get("front", "")
-            prev = parsed.get("prev", "")
-            decision = parsed.get("decision", "")
-            expected_app = prev if (decision == "open_prev" and prev) else target
-            action_name = f"open_app_toggle:{decision or 'unknown'}:{target or 'unknown'}"
-            decision_id = self._sha(f"kar.intent|open_toggle|{source_event_id}|{expected_app}|{decision}")
-            zmeta = self._resolve_zmode_metadata(
-                action_type="open_app_toggle",
-                action_name=action_name,
-                target_app=expected_app,
             )
-
-            self._handle_override(
+        else:
+            self._emit_outcome(
                 ts_ms=ts_ms,
                 session_id=session_id,
-                new_decision_id=decision_id,
-                new_action_name=action_name,
-                new_mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                new_zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                new_candidate_id=str(zmeta.get("candidate_id") or ""),
-                new_candidate_key=str(zmeta.get("candidate_key") or ""),
+                decision_id=decision_id,
+                source_event_id=source_event_id,
+                action_type="open_app_toggle",
+                action_name=action_name,
+                target_app="",
+                outcome="failure",
+                latency_ms=0,
+                observed_app="",
+                reason="missing_expected_target_app",
+                **zmeta,
             )
 
-            self._emit_intent(
+    def _handle_app_activate(
+        self, row: dict[str, Any], name: str, ts_ms: int, session_id: str, source_event_id: str
+    ) -> None:
+        """Resolve pending toggles in this session that were waiting for this app."""
+        app_name = str(row.get("subject") or "")
+        resolved_ids: list[str] = []
+        for decision_id, p in self.pending_by_target.get((session_id, app_name), {}).items():
+            if p.resolved:
+                continue
+            if ts_ms < p.ts_ms or ts_ms > p.expired_at_ms:
+                continue
+            self._emit_outcome(
                 ts_ms=ts_ms,
                 session_id=session_id,
                 decision_id=decision_id,
-                source_event_id=source_event_id,
-                source_event_name=name,
-                action_type="open_app_toggle",
-                action_name=action_name,
-                macro_name="",
-                target_app=expected_app,
-                front_app=front,
-                prev_app=prev,
-                decision=decision,
-                mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                candidate_id=str(zmeta.get("candidate_id") or ""),
-                candidate_key=str(zmeta.get("candidate_key") or ""),
-                candidate_action=str(zmeta.get("candidate_action") or ""),
-                policy_apply_ts_ms=int(zmeta.get("policy_apply_ts_ms") or 0),
+                source_event_id=p.source_event_id,
+                action_type=p.action_type,
+                action_name=p.action_name,
+                target_app=p.target_app,
+                outcome="success",
+                latency_ms=ts_ms - p.ts_ms,
+                observed_app=app_name,
+                reason="target_app_activated",
+                mapping_epoch_id=p.mapping_epoch_id,
+                zmode_policy_decision_id=p.zmode_policy_decision_id,
+                candidate_id=p.candidate_id,
+                candidate_key=p.candidate_key,
+                candidate_action=p.candidate_action,
+                policy_apply_ts_ms=p.policy_apply_ts_ms,
             )
+            p.resolved = True
+            resolved_ids.append(decision_id)
+        for d in resolved_ids:
+            self._drop_pending(d)
+
+    _SOURCE_HANDLERS = {
+        "seqd.run": _handle_run,
+        "cli.run.local": _handle_run,
+        "seqd.open_app_toggle": _handle_seqd_open_toggle,
+        "cli.open_app_toggle.action": _handle_cli_open_toggle,
+        "app.activate": _handle_app_activate,
+    }
 
-            if expected_app:
-                self.pending[decision_id] = PendingIntent(
-                    decision_id=decision_id,
-                    session_id=session_id,
-                    ts_ms=ts_ms,
-                    action_type="open_app_toggle",
-                    action_name=action_name,
-                    target_app=expected_app,
-                    source_event_id=source_event_id,
-                    expired_at_ms=ts_ms + self.cfg.outcome_window_ms,
-                    mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                    zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                    candidate_id=str(zmeta.get("candidate_id") or ""),
-                    candidate_key=str(zmeta.get("candidate_key") or ""),
-                    candidate_action=str(zmeta.get("candidate_action") or ""),
-                    policy_apply_ts_ms=int(zmeta.get("policy_apply_ts_ms") or 0),
-                )
-            else:
-                self._emit_outcome(
-                    ts_ms=ts_ms,
-                    session_id=session_id,
-                    decision_id=decision_id,
-                    source_event_id=source_event_id,
-                    action_type="open_app_toggle",
-                    action_name=action_name,
-                    target_app="",
-                    outcome="failure",
-                    latency_ms=0,
-                    observed_app="",
-                    reason="missing_expected_target_app",
-                    mapping_epoch_id=str(zmeta.get("mapping_epoch_id") or ""),
-                    zmode_policy_decision_id=str(zmeta.get("zmode_policy_decision_id") or ""),
-                    candidate_id=str(zmeta.get("candidate_id") or ""),
-                    candidate_key=str(zmeta.get("candidate_key") or ""),
-                    candidate_action=str(zmeta.get("candidate_action") or ""),
-                    policy_apply_ts_ms=int(zmeta.get("policy_apply_ts_ms") or 0),
-                )
+    def _handle_row(self, row: dict[str, Any]) -> None:
+        name = str(row.get("name") or "")
+        if name in ZMODE_POLICY_NAMES:
+            subject = self._subject(row)
+            if name == "zmode.policy.decision.v1":
+                self._record_zmode_decision(row, subject)
+            elif name == "zmode.policy.apply.v1":
+                self._activate_zmode_policy(row, subject)
+            return
+        # Everything else, our own kar.* rows included, is counted and dropped.
+        handler = self._SOURCE_HANDLERS.get(name)
+        if handler is None:
+            self.rows_skipped += 1
             return
 
-        if name == "app.activate":
-            app_name = str(row.get("subject") or "")
-            resolved_ids: list[str] = []
-            for decision_id, p in self.pending.items():
-                if p.session_id != session_id or p.resolved:
-                    continue
-                if ts_ms < p.ts_ms or ts_ms > p.expired_at_ms:
-                    continue
-                if app_name == p.target_app:
-                    self._emit_outcome(
-                        ts_ms=ts_ms,
-                        session_id=session_id,
-                        decision_id=decision_id,
-                        source_event_id=p.source_event_id,
-                        action_type=p.action_type,
-                        action_name=p.action_name,
-                        target_app=p.target_app,
-                        outcome="success",
-                        latency_ms=ts_ms - p.ts_ms,
-                        observed_app=app_name,
-                        reason="target_app_activated",
-                        mapping_epoch_id=p.mapping_epoch_id,
-                        zmode_policy_decision_id=p.zmode_policy_decision_id,
-                        candidate_id=p.candidate_id,
-                        candidate_key=p.candidate_key,
-                        candidate_action=p.candidate_action,
-                        policy_apply_ts_ms=p.policy_apply_ts_ms,
-                    )
-                    p.resolved = True
-                    resolved_ids.append(decision_id)
-            for d in resolved_ids:
-                self.pending.pop(d, None)
+        ts_ms = int(row.get("ts_ms") or 0)
+        if ts_ms <= 0:
+            ts_ms = int(time.time() * 1000)
+        session_id = str(row.get("session_id") or "") or "kar"
+        source_event_id = str(row.get("event_id") or self._sha(self._safe_json(row)))
+
+        self._expire_pending(ts_ms)
+        handler(self, row, name, ts_ms, session_id, source_event_id)
+
+    def _process_line(self, line: bytes) -> None:
+        self.rows_seen += 1
+        try:
+            obj = _json_loads(line)
+        except Exception:
+            self.rows_skipped += 1
             return
+        if not isinstance(obj, dict):
+            self.rows_skipped += 1
+            return
+        self._handle_row(obj)
+
+    def _process_available(self, fh: BinaryIO, *, final: bool, checkpoint: bool) -> None:
+        """Process rows from `self.offset` to EOF, reading READ_CHUNK_BYTES at a time.
+
+        A trailing line with no newline yet is left for the next poll unless
+        `final` is set. Emitted rows are buffered and flushed at EOF; they are
+        read back (and skipped) once they land, in this call or a later one.
+        """
+        fh.seek(self.offset)
+        buf = b""
+        while not self.stop_requested:
+            chunk = fh.read(READ_CHUNK_BYTES)
+            if not chunk:
+                if not self.emit_buf:
+                    break
+                self._flush_emit()
+                continue
+            buf = buf + chunk if buf else chunk
+            start = 0
+            while not self.stop_requested:
+                nl = buf.find(b"\n", start)
+                if nl < 0:
+                    break
+                line = buf[start : nl + 1]
+                start = nl + 1
+                self.offset += len(line)
+                self._process_line(line)
+                if checkpoint and self.rows_seen % 100 == 0:
+                    self.save_state(force=False)
+            buf = buf[start:]
+        if final and buf and not self.stop_requested:
+            self.offset += len(buf)
+            self._process_line(buf)
 
     def process_from_offset_once(self) -> int:
         self.load_state()
@@ -925,50 +1099,15 @@ class KarSignalCapture:
             self.offset = 0
         self.inode = inode
 
-        with self.cfg.seq_mem_path.open("r", encoding="utf-8", errors="replace") as fh:
-            fh.seek(self.offset)
-            while True:
-                line = fh.readline()
-                if not line:
-                    break
-                self.offset = fh.tell()
-                self.rows_seen += 1
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    self.rows_skipped += 1
-                    continue
-                if not isinstance(obj, dict):
-                    self.rows_skipped += 1
-                    continue
-                self._handle_row(obj)
+        with self.cfg.seq_mem_path.open("rb") as fh:
+            self._process_available(fh, final=True, checkpoint=False)
 
         self._expire_pending(int(time.time() * 1000))
         self.save_state(force=True)
         self.log(f"once complete: seen={self.rows_seen} emitted={self.rows_emitted} skipped={self.rows_skipped}")
         return 0
 
-    def run_forever(self) -> int:
-        signal.signal(signal.SIGINT, self.request_stop)
-        signal.signal(signal.SIGTERM, self.request_stop)
-
-        self.load_state()
-        if not self.state_loaded and self.cfg.seq_mem_path.exists():
-            try:
-                stat0 = self.cfg.seq_mem_path.stat()
-                self.offset = int(stat0.st_size)
-                self.inode = int(getattr(stat0, "st_ino", 0))
-                self.log(
-                    f"no prior state; tailing from EOF offset={self.offset} "
-                    f"(use 'once' for historical backfill)"
-                )
-            except Exception:
-                pass
-        self.log(
-            f"kar signal capture started (seq_mem={self.cfg.seq_mem_path}, "
-            f"outcome_window_ms={self.cfg.outcome_window_ms}, override_window_ms={self.cfg.override_window_ms})"
-        )
-
+    def _tail(self) -> None:
         while not self.stop_requested:
             if not self.cfg.seq_mem_path.exists():
                 time.sleep(self.cfg.poll_seconds)
@@ -990,37 +1129,65 @@ class KarSignalCapture:
                 self.log("seq_mem truncated; resetting offset")
                 self.offset = 0
 
-            with self.cfg.seq_mem_path.open("r", encoding="utf-8", errors="replace") as fh:
-                fh.seek(self.offset)
-                while not self.stop_requested:
-                    line = fh.readline()
-                    if line:
-                        self.offset = fh.tell()
-                        self.rows_seen += 1
+            with self.cfg.seq_mem_path.open("rb") as fh:
+                # Registered before the first drain; EV_CLEAR keeps any write
+                # that lands in between pending for the next wait.
+                kq = _watch_file(fh)
+                try:
+                    while not self.stop_requested:
+                        self._process_available(fh, final=False, checkpoint=True)
+                        if self.stop_requested:
+                            break
+
+                        self._expire_pending(int(time.time() * 1000))
+                        self._flush_emit()
+                        self.save_state(force=False)
+                        if kq is None:
+                            time.sleep(self.cfg.poll_seconds)
+                        else:
+                            # poll_seconds stays the upper bound so expiry and
+                            # state saves still tick while seq_mem is idle.
+                            kq.control(None, 1, self.cfg.poll_seconds)
+
                         try:
-                            obj = json.loads(line)
-                        except Exception:
-                            self.rows_skipped += 1
-                            continue
-                        if not isinstance(obj, dict):
-                            self.rows_skipped += 1
-                            continue
-                        self._handle_row(obj)
-                        if self.rows_seen % 100 == 0:
-                            self.save_state(force=False)
-                        continue
-
-                    self._expire_pending(int(time.time() * 1000))
-                    self.save_state(force=False)
-                    time.sleep(self.cfg.poll_seconds)
-
-                    try:
-                        stat2 = self.cfg.seq_mem_path.stat()
-                    except FileNotFoundError:
-                        break
-                    inode2 = int(getattr(stat2, "st_ino", 0))
-                    if inode2 != self.inode or stat2.st_size < self.offset:
-                        break
+                            stat2 = self.cfg.seq_mem_path.stat()
+                        except FileNotFoundError:
+                            break
+                        inode2 = int(getattr(stat2, "st_ino", 0))
+                        if inode2 != self.inode or stat2.st_size < self.offset:
+                            break
+                finally:
+                    if kq is not None:
+                        kq.close()
+
+    def run_forever(self) -> int:
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+
+        self.load_state()
+        if not self.state_loaded and self.cfg.seq_mem_path.exists():
+            try:
+                stat0 = self.cfg.seq_mem_path.stat()
+                self.offset = int(stat0.st_size)
+                self.inode = int(getattr(stat0, "st_ino", 0))
+                self.log(
+                    f"no prior state; tailing from EOF offset={self.offset} "
+                    f"(use 'once' for historical backfill)"
+                )
+            except Exception:
+                pass
+        self.log(
+            f"kar signal capture started (seq_mem={self.cfg.seq_mem_path}, "
+            f"outcome_window_ms={self.cfg.outcome_window_ms}, override_window_ms={self.cfg.override_window_ms})"
+        )
+
+        # Rows are parsed and dispatched on this thread while the writer
+        # thread appends the previous batch to the sink.
+        self._start_writer()
+        try:
+            self._tail()
+        finally:
+            self._stop_writer()
 
         self._expire_pending(int(time.time() * 1000))
         self.save_state(force=True)
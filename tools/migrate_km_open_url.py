@@ -21,7 +21,11 @@ _spec = importlib.util.spec_from_file_location("gen_macros", _GEN)
 assert _spec and _spec.loader
 _mod = importlib.util.module_from_spec(_spec)
 _spec.loader.exec_module(_mod)  # type: ignore[attr-defined]
-classify = _mod.classify
+classify = _mod.make_classifier(
+    _mod.load_tsv_map(_mod.ARC_ALIASES_PATH),
+    _mod.load_tsv_map(_mod.TELEGRAM_ALIASES_PATH),
+    _mod.load_tsv_map(_mod.WEB_ALIASES_PATH),
+)
 
 
 CONFIG = Path("/Users/nikiv/config/i/kar/config.ts")